@@ -0,0 +1,267 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import loader
+from count import count_slashes_in_urls
+from effort import compute_effort
+from export import export_file
+from filters import column_kind, get_engine
+from journal import bulk_changeset
+from loader import derive_version
+from metrics import compute_metrics
+from overlay import Overlay
+from snapshot import snapshot_path
+from storage import CsvStore, SqliteStore
+from synthetic import synthetic_tracker, write_tracker
+
+SIZES = [1_000, 100_000, 1_000_000]
+REPEAT = 5
+RESULTS_DIR = 'benchmarks'
+
+# Rows changed by the incremental save, like one page of editor edits
+EDITED_ROWS = 25
+
+
+def timed(func, repeat: int = REPEAT) -> dict:
+    """
+    Times a call once cold and then ``repeat`` more times
+
+    The first call is reported on its own, since that is where caches get filled.
+
+    Args:
+        func (callable): Call to time, without arguments
+        repeat (int, optional): Timed calls after the first. Defaults to ``REPEAT``.
+
+    Returns:
+        dict: ``first``, ``median`` and ``min`` seconds and the number of ``runs``
+    """
+    runs = []
+    for _ in range(repeat + 1):
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    warm = runs[1:] or runs
+    return {'first': runs[0], 'median': statistics.median(warm), 'min': min(warm), 'runs': len(runs)}
+
+
+def filter_cases(df: pd.DataFrame) -> dict:
+    """
+    One selection per filter widget branch, plus all of them combined
+
+    Args:
+        df (pd.DataFrame): Frame from :func:`filter_frame`
+
+    Returns:
+        dict: Case name to selections, as taken by :meth:`filters.FilterEngine.apply`
+    """
+    started = df['IP'].dropna()
+    start = started.min() if len(started) else pd.Timestamp(0)
+    cases = {
+        'category': {'State': ['In Progress', 'Content Review', 'Blocked']},
+        'numeric': {'Days open': (0.0, float(df['Days open'].median()))},
+        'datetime': {'IP': (start, start + pd.Timedelta(days=90))},
+        'text substring': {'Title': 'Deer'},
+        'text regex': {'Legacy URL': r'/fishing-boating/.*lake'},
+    }
+    cases['combined'] = {column: selected for case in cases.values() for column, selected in case.items()}
+    return cases
+
+
+def filter_frame(df: pd.DataFrame, seed: int = 0) -> pd.DataFrame:
+    """
+    The tracker plus a datetime and a continuous numeric column, so every filter branch is hit
+
+    ``IP`` comes from the generator's cycle columns and ``Days open`` is the time since then.
+    """
+    dated = synthetic_tracker(len(df), seed, cycle_columns=True)
+    days = (pd.Timestamp.now() - dated['IP']) / pd.Timedelta(days=1)
+    frame = df.assign(IP=dated['IP'].to_numpy(), **{'Days open': days.to_numpy()})
+    frame.attrs["version"] = derive_version(df.attrs.get("version"), 'filter benchmark')
+    return frame
+
+
+def run_size(rows: int, workdir: str, repeat: int = REPEAT, seed: int = 0, backend: str = 'csv') -> list:
+    """
+    Times the app's data paths on a synthetic tracker of one size
+
+    Args:
+        rows (int): Tracker rows
+        workdir (str): Directory for the generated tracker and store files
+        repeat (int, optional): Timed calls after the first. Defaults to ``REPEAT``.
+        seed (int, optional): Generator seed. Defaults to 0.
+        backend (str, optional): ``"csv"`` or ``"sqlite"``, the store saved to and reloaded from
+
+    Returns:
+        list: One dict per benchmark with ``rows``, ``name`` and the :func:`timed` figures; the
+        filter benchmarks also list the index ``kinds`` their columns got
+    """
+    path = os.path.join(workdir, f'tracker-{rows}.csv')
+    write_tracker(path, rows, seed)
+    database = os.path.join(workdir, f'tracker-{rows}.db')
+    if os.path.exists(database):
+        os.remove(database)
+
+    def open_store():
+        return SqliteStore(database, path) if backend == 'sqlite' else CsvStore(path)
+
+    store = open_store()
+    results = []
+
+    def record(name, func, runs=repeat, **details):
+        results.append({'rows': rows, 'name': name, **timed(func, runs), **details})
+
+    # getData: parsing the CSV or mapping its snapshot the first time, then the cached frame
+    def cold_load(columns=None, parse=False):
+        loader.invalidate(path)
+        if parse and os.path.exists(snapshot_path(path)):
+            os.remove(snapshot_path(path))
+        return open_store().load(columns)
+    record('getData (parse)', lambda: cold_load(parse=True), runs=min(repeat, 2))
+    record('getData (snapshot)', cold_load)
+    record('getData (snapshot, metrics columns)', lambda: cold_load(['State', 'Users', 'count']))
+    record('getData (cached)', store.load)
+    df = store.load()
+
+    frame = filter_frame(df, seed)
+    for case, selections in filter_cases(frame).items():
+        kinds = sorted({column_kind(frame[column]) for column in selections})
+        record(f'filter {case}', lambda: get_engine(frame).apply(selections), kinds=kinds)
+
+    record('metrics', lambda: compute_metrics(df))
+    # A session with a page of unsaved edits: the shared counts adjusted by its overlay
+    pending = {'upserts': [[int(label), {'State': 'Done'}] for label in df.index[:EDITED_ROWS]], 'deleted': [], 'added': []}
+    record('metrics with unsaved edits', lambda: Overlay(df, pending).metrics())
+    record('effort', lambda: compute_effort(df))
+    # The first export serializes every chunk; later ones reuse the cached chunks
+    record('export csv', lambda: export_file(df, 'csv'))
+    record('export parquet', lambda: export_file(df, 'parquet'))
+    record('count_slashes_in_urls', lambda: count_slashes_in_urls(df.copy(deep=False), 'Legacy URL'))
+
+    # Saving a page of edits, then loading the frame the next rerun sees
+    edited = df.index[np.linspace(0, len(df) - 1, min(EDITED_ROWS, len(df))).astype(int)]
+    states = iter(['In Progress', 'Content Review'] * repeat * EDITED_ROWS)
+    record('save edits', lambda: store.save({
+        'upserts': [[int(label), {'State': next(states)}] for label in edited], 'deleted': [], 'added': [],
+    }))
+    record('reload after save', store.load)
+    # Reassigning a tenth of the tracker in one save, as the bulk edit panel does
+    section = df.index[::10]
+    owners = iter(['Jim', 'Braden'] * (repeat + 1))
+    record('bulk edit', lambda: store.save(bulk_changeset(store.load(columns=['Users']), section, {'Users': next(owners)})))
+    record('save full frame', lambda: store.replace(store.load()), runs=min(repeat, 2))
+    return results
+
+
+def startup(repeat: int = REPEAT) -> list:
+    """
+    Times fresh interpreters importing the entry point (up to the login form) and the tracker page
+
+    Returns:
+        list: Results like :func:`run_size`'s, with ``rows`` 0
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    for name, module in [('import entry point', 'Hello'), ('import tracker page', 'tracker_page')]:
+        results.append({'rows': 0, 'name': name, **timed(
+            lambda: subprocess.run([sys.executable, '-c', f'import {module}'], cwd=here, check=True, capture_output=True),
+            repeat,
+        )})
+    return results
+
+
+def environment() -> dict:
+    """Interpreter, library and commit details stored with the results, so runs can be compared"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor() or None,
+        'cpus': os.cpu_count(),
+        'ts': pd.Timestamp.now(tz='UTC').isoformat(),
+    }
+
+
+def run_benchmarks(sizes=SIZES, repeat: int = REPEAT, seed: int = 0, backend: str = 'csv', workdir: str = None) -> dict:
+    """
+    Runs every benchmark at every size, without a Streamlit server
+
+    Args:
+        sizes (list, optional): Tracker sizes in rows. Defaults to ``SIZES``.
+        repeat (int, optional): Timed calls after the first. Defaults to ``REPEAT``.
+        seed (int, optional): Generator seed. Defaults to 0.
+        backend (str, optional): Store to save to and reload from. Defaults to ``"csv"``.
+        workdir (str, optional): Where to keep the generated files. Defaults to a temporary directory.
+
+    Returns:
+        dict: ``environment``, ``settings`` and ``results``
+    """
+    results = startup(repeat)
+    with tempfile.TemporaryDirectory() as scratch:
+        workdir = workdir or scratch
+        os.makedirs(workdir, exist_ok=True)
+        for rows in sizes:
+            results += run_size(rows, workdir, repeat, seed, backend)
+    return {
+        'environment': environment(),
+        'settings': {'sizes': list(sizes), 'repeat': repeat, 'seed': seed, 'backend': backend},
+        'results': results,
+    }
+
+
+def compare(baseline: dict, current: dict) -> pd.DataFrame:
+    """
+    Lines up two result files by benchmark and size
+
+    Args:
+        baseline (dict): Earlier output of :func:`run_benchmarks`
+        current (dict): Later output of :func:`run_benchmarks`
+
+    Returns:
+        pd.DataFrame: Median seconds of both and their ratio; a ratio above 1 is a slowdown
+    """
+    def medians(run):
+        return pd.DataFrame(run['results']).set_index(['name', 'rows'])['median']
+    table = pd.concat({'baseline': medians(baseline), 'current': medians(current)}, axis=1)
+    return table.assign(ratio=table['current'] / table['baseline'])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the tracker's data paths on synthetic trackers")
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--backend', choices=['csv', 'sqlite'], default='csv')
+    parser.add_argument('--workdir', help="keep the generated trackers here instead of a temporary directory")
+    parser.add_argument('--output', help=f"results file; defaults to a timestamped file in {RESULTS_DIR}/")
+    parser.add_argument('--compare', metavar='BASELINE', help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.sizes, args.repeat, args.seed, args.backend, args.workdir)
+    output = args.output or os.path.join(RESULTS_DIR, f"{pd.Timestamp.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as handle:
+        json.dump(report, handle, indent=2, default=str)
+
+    with pd.option_context('display.width', 200, 'display.max_rows', None, 'display.max_columns', None):
+        table = pd.DataFrame(report['results']).set_index(['name', 'rows'])
+        print((table[['first', 'median', 'min']] * 1000).round(2).rename(columns=lambda col: f'{col} ms'))
+        if args.compare:
+            with open(args.compare, encoding='utf-8') as handle:
+                print(compare(json.load(handle), report).round(4))
+    print(f"Results written to {output}")
@@ -1,5 +1,6 @@
 import pandas as pd
-import re
+
+from urls import analyze_urls
 
 def count_slashes_in_urls(df, url_column, new_column_name="num_slashes"):
     """
@@ -14,24 +15,19 @@ def count_slashes_in_urls(df, url_column, new_column_name="num_slashes"):
         pandas.DataFrame: The DataFrame with the additional column containing the slash counts.
     """
 
-    df[new_column_name] = df[url_column].apply(lambda url: len(re.findall(r"/\/", url)))
+    df[new_column_name] = analyze_urls(df[url_column])['slashes']
     return df
 
 # Example usage
 
-df = pd.read_csv('folder/out.csv').astype(str) 
-# df['new_column_name'] = df['url'].apply(lambda url: len(re.findall(r"/\/", 'url')))
-# df['count'] = df['Legacy URL'].apply(lambda x: x.count('/'))
-# df['IP'] = df['IP'].astype('datetime64[ns]')
-# df['Content Review'] = pd.to_datetime(df['Content Review'])
-# df['Client Review'] = pd.to_datetime(df['Client Review'])
-# df['Done'] = pd.to_datetime(df['Done'])
-df['IP'] = pd.Timestamp('now')
-df['Content Review'] = pd.Timestamp('now')
-df['client Review'] = pd.Timestamp('now')
-df['Done'] = pd.Timestamp('now')
-
-
-
-print(df)
-df.to_csv('folder/out.csv', index=False) 
+if __name__ == "__main__":
+    df = pd.read_csv('folder/out.csv').astype(str) 
+    # df['new_column_name'] = df['url'].apply(lambda url: len(re.findall(r"/\/", 'url')))
+    # df['count'] = df['Legacy URL'].apply(lambda x: x.count('/'))
+    # df['IP'] = df['IP'].astype('datetime64[ns]')
+    # df['Content Review'] = pd.to_datetime(df['Content Review'])
+    # df['Client Review'] = pd.to_datetime(df['Client Review'])
+    # df['Done'] = pd.to_datetime(df['Done'])
+    count_slashes_in_urls(df, 'Legacy URL')
+
+    print(df)
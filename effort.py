@@ -0,0 +1,163 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from memo import SharedMemo
+from schema import EFFORT_COLUMN
+
+# Hours of migration work per page, by effort level (the ``count`` column); projects may set their own
+EFFORT_HOURS = {3: 2, 4: 2, 5: 1, 6: .5, 7: .5}
+
+_memo = SharedMemo(32)
+
+
+@dataclass(frozen=True)
+class EffortModel:
+    """Hours of work per page for each effort level"""
+
+    hours: dict = field(default_factory=lambda: dict(EFFORT_HOURS))
+
+    @classmethod
+    def for_project(cls, project) -> 'EffortModel':
+        """The effort model configured for a project, or the default one"""
+        return cls(dict(project.effort_hours or EFFORT_HOURS))
+
+    @property
+    def key(self) -> tuple:
+        """Hashable form of the model, for cache keys"""
+        return tuple(sorted(self.hours.items()))
+
+    def page_hours(self, levels) -> np.ndarray:
+        """
+        Maps effort levels to hours per page in one vectorized lookup
+
+        Args:
+            levels: Effort levels, e.g. the ``count`` column or a grouped index level
+
+        Returns:
+            np.ndarray: Hours per page as floats; NaN for missing levels and levels the model has no hours for
+        """
+        known = pd.Index(list(self.hours))
+        weights = np.append(np.array(list(self.hours.values()), dtype=float), np.nan)
+        # Unknown levels get position -1, which picks the trailing NaN
+        return weights[known.get_indexer(pd.Index(levels))]
+
+
+@dataclass(frozen=True)
+class EffortBreakdown:
+    """Estimated hours of a tracker, per level, user and state"""
+
+    levels: pd.DataFrame = field(default_factory=pd.DataFrame)
+    users: pd.Series = field(default_factory=lambda: pd.Series(dtype=float))
+    states: pd.Series = field(default_factory=lambda: pd.Series(dtype=float))
+    by_user_state: pd.DataFrame = field(default_factory=pd.DataFrame)
+    unestimated: int = 0
+
+    @property
+    def total_hours(self) -> float:
+        """Estimated hours of all pages with a known level"""
+        return float(self.levels['hours'].sum()) if len(self.levels) else 0.0
+
+    def unknown_levels(self) -> list:
+        """Effort levels found in the tracker that the model has no hours for"""
+        if self.levels.empty:
+            return []
+        return [level for level, hours in self.levels['hours per page'].items() if pd.isna(hours)]
+
+
+def _levels(levels: pd.Index, pages: pd.Series, model: EffortModel) -> pd.DataFrame:
+    """Pages, hours per page and hours for every configured level and every level found"""
+    table = pd.DataFrame({'pages': pages.reindex(levels, fill_value=0).astype(int)}, index=levels)
+    table['hours per page'] = model.page_hours(levels)
+    table['hours'] = table['pages'] * table['hours per page']
+    table.index.name = 'level'
+    return table
+
+
+def compute_effort(df: pd.DataFrame, model: EffortModel = None) -> EffortBreakdown:
+    """
+    Estimates the hours of work left in a tracker from a single grouped pass
+
+    The rows are grouped once by Users, State and effort level; hours per page are then mapped
+    onto the (small) grouped result and every breakdown is summed from it. Levels the model
+    has no hours for are listed with their pages rather than dropped.
+
+    Args:
+        df (pd.DataFrame): Tracker rows
+        model (EffortModel, optional): Hours per level. Defaults to ``EFFORT_HOURS``.
+
+    Returns:
+        EffortBreakdown: Pages and hours per level, hours per user, per state and per user and
+        state, and the number of pages without an estimate
+    """
+    model = model or EffortModel()
+    if EFFORT_COLUMN not in df.columns or df.empty:
+        return effort_from_counts(pd.Series(dtype='int64'), len(df), model)
+    keys = [col for col in ('Users', 'State') if col in df.columns] + [EFFORT_COLUMN]
+    return effort_from_counts(df.groupby(keys, observed=True, dropna=False).size(), len(df), model)
+
+
+def effort_from_counts(counts: pd.Series, total: int, model: EffortModel = None) -> EffortBreakdown:
+    """
+    Builds the effort breakdown from grouped page counts
+
+    Args:
+        counts (pd.Series): Pages per combination of effort level and, when known, Users and
+            State, e.g. from :func:`metrics.page_counts`
+        total (int): Number of pages the counts were taken from
+        model (EffortModel, optional): Hours per level. Defaults to ``EFFORT_HOURS``.
+
+    Returns:
+        EffortBreakdown: See :func:`compute_effort`
+    """
+    model = model or EffortModel()
+    levels = pd.Index(list(model.hours), name='level')
+    keys = [name for name in counts.index.names if name is not None]
+    if EFFORT_COLUMN not in keys:
+        return EffortBreakdown(levels=_levels(levels, pd.Series(dtype=int), model), unestimated=total)
+
+    grouped = counts.rename('pages').reset_index()
+    grouped['hours'] = grouped['pages'] * model.page_hours(grouped[EFFORT_COLUMN])
+    estimated = grouped[grouped['hours'].notna()]
+
+    pages = grouped.dropna(subset=[EFFORT_COLUMN]).groupby(EFFORT_COLUMN)['pages'].sum()
+    pages.index = pages.index.astype(int)
+
+    def by(column):
+        if column not in keys:
+            return pd.Series(dtype=float)
+        return estimated.groupby(column, observed=True)['hours'].sum()
+
+    by_user_state = pd.DataFrame()
+    if {'Users', 'State'} <= set(keys):
+        by_user_state = estimated.groupby(['Users', 'State'], observed=True)['hours'].sum().unstack(fill_value=0)
+    return EffortBreakdown(
+        levels=_levels(levels.union(pages.index), pages, model),
+        users=by('Users'),
+        states=by('State'),
+        by_user_state=by_user_state,
+        unestimated=int(grouped.loc[grouped['hours'].isna(), 'pages'].sum()),
+    )
+
+
+def cached_effort(df: pd.DataFrame, model: EffortModel = None, version=None) -> EffortBreakdown:
+    """
+    Returns the effort breakdown for a frame, reusing the one computed for the same data version and model
+
+    Args:
+        df (pd.DataFrame): Tracker rows
+        model (EffortModel, optional): Hours per level. Defaults to ``EFFORT_HOURS``.
+        version (optional): Token identifying the frame's contents. Defaults to
+            ``df.attrs["version"]``; frames without a version are always recomputed.
+
+    Returns:
+        EffortBreakdown: Breakdown for the frame
+    """
+    model = model or EffortModel()
+    if version is None:
+        version = df.attrs.get("version")
+    if version is None:
+        return compute_effort(df, model)
+
+    return _memo.get((version, model.key), lambda: compute_effort(df, model))
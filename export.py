@@ -0,0 +1,180 @@
+import hashlib
+import importlib.util
+import io
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from memo import SharedMemo
+from schema import ID_COLUMN
+
+# Rows serialized at a time; only one chunk of output is built in memory
+CHUNK_ROWS = 10_000
+# Serialized chunks kept for the next export, across sessions
+CACHE_BYTES = 64 * 2**20
+# Rows an Excel sheet can hold, header included
+XLSX_MAX_ROWS = 1_048_576
+
+FORMATS = {
+    'csv': ('CSV', 'text/csv', '.csv'),
+    'xlsx': ('Excel', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', '.xlsx'),
+    'parquet': ('Parquet', 'application/vnd.apache.parquet', '.parquet'),
+}
+
+_chunks = SharedMemo(max_bytes=CACHE_BYTES)
+_hashes = SharedMemo(8)
+
+
+def available_formats() -> list:
+    """Export formats usable here; Excel needs the optional ``xlsxwriter`` package"""
+    return [fmt for fmt in FORMATS if fmt != 'xlsx' or importlib.util.find_spec('xlsxwriter')]
+
+
+def _chunk_key(fmt: str, chunk: pd.DataFrame, row_hashes, first: bool) -> tuple:
+    digest = hashlib.blake2b(row_hashes.tobytes(), digest_size=16).hexdigest()
+    schema = tuple((col, str(dtype)) for col, dtype in chunk.dtypes.items())
+    return fmt, schema, digest, first
+
+
+def row_hashes(df: pd.DataFrame):
+    """
+    Content hash of every row of a view, page id included
+
+    Hashing is the part of an export that is not cached by chunk, so the hashes of a view are
+    kept per data version and row selection; exporting an unchanged view again hashes nothing.
+
+    Args:
+        df (pd.DataFrame): Rows to export, in order
+
+    Returns:
+        np.ndarray: One uint64 per row
+    """
+    version = df.attrs.get("version")
+    if version is None:
+        return pd.util.hash_pandas_object(df, index=True).to_numpy()
+    key = (version, tuple(df.columns), hashlib.blake2b(df.index.to_numpy().tobytes(), digest_size=16).hexdigest())
+    return _hashes.get(key, lambda: pd.util.hash_pandas_object(df, index=True).to_numpy())
+
+
+def iter_chunks(df: pd.DataFrame, chunk_rows: int = CHUNK_ROWS):
+    """
+    Splits a view into chunks, each with the content hash of its rows
+
+    Rows are hashed with their page ids in one vectorized pass (see :func:`row_hashes`); a chunk
+    whose rows did not change since an earlier export gets the same hash, so its serialized
+    form can be reused.
+
+    Args:
+        df (pd.DataFrame): Rows to export, in order
+        chunk_rows (int, optional): Rows per chunk. Defaults to ``CHUNK_ROWS``.
+
+    Yields:
+        tuple: ``(chunk, row_hashes)``
+    """
+    hashes = row_hashes(df)
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows], hashes[start:start + chunk_rows]
+
+
+def csv_chunks(df: pd.DataFrame, chunk_rows: int = CHUNK_ROWS):
+    """
+    Streams a view as UTF-8 CSV, one chunk of rows at a time
+
+    The page id is the first column. Chunks serialized by an earlier export of the same rows
+    are reused from a process-wide cache.
+
+    Args:
+        df (pd.DataFrame): Rows to export, in order
+        chunk_rows (int, optional): Rows per chunk. Defaults to ``CHUNK_ROWS``.
+
+    Yields:
+        bytes: The header with the first chunk, then one block of lines per chunk
+    """
+    if df.empty:
+        yield df.to_csv(index_label=ID_COLUMN).encode('utf-8')
+        return
+    for number, (chunk, hashes) in enumerate(iter_chunks(df, chunk_rows)):
+        first = number == 0
+        yield _chunks.get(
+            _chunk_key('csv', chunk, hashes, first),
+            lambda: chunk.to_csv(header=first, index_label=ID_COLUMN).encode('utf-8'),
+        )
+
+
+def _parquet_table(chunk: pd.DataFrame) -> pa.Table:
+    return pa.Table.from_pandas(chunk.rename_axis(ID_COLUMN), preserve_index=True)
+
+
+def write_export(df: pd.DataFrame, fmt: str, target, chunk_rows: int = CHUNK_ROWS) -> None:
+    """
+    Writes a view to a binary file-like object in one of the :data:`FORMATS`
+
+    CSV chunks and Parquet row groups are built a chunk at a time and cached by content. Excel
+    rows are streamed by the optional ``xlsxwriter`` package in constant-memory mode.
+
+    Args:
+        df (pd.DataFrame): Rows to export, in order
+        fmt (str): ``"csv"``, ``"xlsx"`` or ``"parquet"``
+        target: Writable binary file-like object
+        chunk_rows (int, optional): Rows per chunk. Defaults to ``CHUNK_ROWS``.
+    """
+    if fmt == 'csv':
+        for block in csv_chunks(df, chunk_rows):
+            target.write(block)
+    elif fmt == 'parquet':
+        schema = _parquet_table(df.iloc[:0]).schema
+        with pq.ParquetWriter(target, schema) as writer:
+            for chunk, hashes in iter_chunks(df, chunk_rows):
+                writer.write_table(_chunks.get(
+                    _chunk_key('parquet', chunk, hashes, False),
+                    lambda: _parquet_table(chunk).cast(schema),
+                ))
+    elif fmt == 'xlsx':
+        if len(df) >= XLSX_MAX_ROWS:
+            raise ValueError(f"{len(df)} rows do not fit in an Excel sheet; export CSV or Parquet instead")
+        import xlsxwriter
+        # Rows are written in order and flushed as they go, so the workbook is never held whole
+        workbook = xlsxwriter.Workbook(target, {
+            'constant_memory': True, 'strings_to_formulas': False, 'strings_to_urls': False,
+            'default_date_format': 'yyyy-mm-dd hh:mm',
+        })
+        sheet = workbook.add_worksheet('Tracker')
+        sheet.write_row(0, 0, [ID_COLUMN, *map(str, df.columns)])
+        row = 1
+        for chunk, _ in iter_chunks(df, chunk_rows):
+            cells = chunk.astype(object).where(chunk.notna(), None)
+            for label, values in zip(chunk.index.tolist(), cells.itertuples(index=False, name=None)):
+                sheet.write_row(row, 0, (label, *values))
+                row += 1
+        workbook.close()
+    else:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {', '.join(FORMATS)}")
+
+
+def export_file(df: pd.DataFrame, fmt: str = 'csv', chunk_rows: int = CHUNK_ROWS) -> bytes:
+    """
+    Exports a view to bytes, as taken by ``st.download_button``
+
+    Args:
+        df (pd.DataFrame): Rows to export, in order
+        fmt (str, optional): One of :data:`FORMATS`. Defaults to ``"csv"``.
+        chunk_rows (int, optional): Rows per chunk. Defaults to ``CHUNK_ROWS``.
+
+    Returns:
+        bytes: The whole export
+    """
+    target = io.BytesIO()
+    write_export(df, fmt, target, chunk_rows)
+    return target.getvalue()
+
+
+def file_name(title: str, fmt: str) -> str:
+    """Download file name for an export of a project"""
+    stem = ''.join(char if char.isalnum() else '-' for char in title.lower()).strip('-') or 'tracker'
+    return f"{stem}-{pd.Timestamp.now():%Y%m%d}{FORMATS[fmt][2]}"
+
+
+def cache_stats() -> dict:
+    """Chunks and bytes held by the export cache"""
+    return _chunks.stats()
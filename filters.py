@@ -0,0 +1,256 @@
+import hashlib
+import re
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype, is_numeric_dtype
+
+from memo import SharedMemo
+
+# Columns with fewer distinct values than this are filtered like categoricals
+CATEGORY_THRESHOLD = 10
+
+# Shortest substring the trigram index can answer
+TRIGRAM = 3
+
+_REGEX_CHARS = re.compile(r"[.^$*+?{}\[\]\\|()]")
+
+_columns = SharedMemo(128)
+_engines = SharedMemo(16)
+
+
+class CategoryIndex:
+    """Row codes of a low-cardinality column; a selection becomes one lookup-table gather"""
+
+    kind = 'category'
+
+    def __init__(self, series: pd.Series):
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes, labels = series.cat.codes.to_numpy(), list(series.cat.categories)
+        else:
+            codes, uniques = pd.factorize(series, use_na_sentinel=True)
+            labels = list(uniques)
+        present = np.bincount(codes + 1, minlength=len(labels) + 1)
+        self.codes = codes
+        self.labels = labels
+        self.options = [label for label, count in zip(labels, present[1:]) if count]
+        if present[0]:
+            self.options.append(None)
+
+    def mask(self, selected: list) -> np.ndarray:
+        wanted = set(selected)
+        # The extra last slot is picked up by missing values (code -1)
+        table = np.array([label in wanted for label in self.labels] + [None in wanted], dtype=bool)
+        return table[self.codes]
+
+
+class SortedIndex:
+    """Non-missing values of a numeric or datetime column in sorted order, for range lookups"""
+
+    def __init__(self, series: pd.Series, kind: str):
+        self.kind = kind
+        values = series.to_numpy(dtype='datetime64[ns]' if kind == 'datetime' else 'float64', na_value=np.nan)
+        if kind == 'datetime':
+            valid = ~np.isnat(values)
+        else:
+            valid = ~np.isnan(values)
+        positions = np.flatnonzero(valid)
+        order = np.argsort(values[positions], kind='stable')
+        self.size = len(values)
+        self.positions = positions[order]
+        self.values = values[positions][order]
+
+    @property
+    def bounds(self) -> tuple:
+        if not len(self.values):
+            return None, None
+        low, high = self.values[0], self.values[-1]
+        if self.kind == 'datetime':
+            return pd.Timestamp(low), pd.Timestamp(high)
+        return float(low), float(high)
+
+    def mask(self, bounds: tuple) -> np.ndarray:
+        low, high = bounds
+        if self.kind == 'datetime':
+            low, high = np.datetime64(pd.Timestamp(low), 'ns'), np.datetime64(pd.Timestamp(high), 'ns')
+        start = np.searchsorted(self.values, low, side='left')
+        stop = np.searchsorted(self.values, high, side='right')
+        mask = np.zeros(self.size, dtype=bool)
+        mask[self.positions[start:stop]] = True
+        return mask
+
+
+class TextIndex:
+    """
+    Free-text column with a trigram index over its distinct values
+
+    The index is built the first time the column is searched. Literal substrings of three or
+    more characters are answered by intersecting the values holding each of their trigrams and
+    checking only those; regular expressions fall back to a vectorized scan.
+    """
+
+    kind = 'text'
+
+    def __init__(self, series: pd.Series):
+        self.series = series.astype('string')
+        self._codes = None
+        self._values = None
+        self._trigrams = None
+
+    def _index(self) -> tuple:
+        if self._trigrams is None:
+            codes, uniques = pd.factorize(self.series, use_na_sentinel=True)
+            values = list(uniques)
+            lowered = [text.lower() for text in values]
+            lengths = np.fromiter((len(text) for text in lowered), dtype=np.int64, count=len(lowered))
+            # Every character as a code point, values separated by one slot that belongs to none
+            chars = np.frombuffer('\x00'.join(lowered).encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+            owner = np.repeat(np.arange(len(lowered)), lengths + 1)[:len(chars)]
+            owner[np.cumsum(lengths + 1)[:-1] - 1] = -1
+            # Renumber the characters that occur densely so a (trigram, value) pair fits one int64
+            present = np.flatnonzero(np.bincount(chars)) if len(chars) else chars
+            dense = np.zeros(int(present[-1]) + 1 if len(present) else 1, dtype=np.int64)
+            dense[present] = np.arange(len(present))
+            alphabet = max(len(present), 1)
+            chars = dense[chars]
+            inside = (owner[:-2] == owner[2:]) & (owner[:-2] >= 0)
+            grams = ((chars[:-2] * alphabet + chars[1:-1]) * alphabet + chars[2:])[inside]
+            pairs = np.sort(grams * max(len(values), 1) + owner[:-2][inside])
+            pairs = pairs[np.diff(pairs, prepend=-1) != 0]
+            grams, owner = np.divmod(pairs, max(len(values), 1))
+            starts = np.flatnonzero(np.diff(grams, prepend=-1))
+            self._codes, self._values = codes, pd.Series(values, dtype='string')
+            self._alphabet = {chr(code): rank for rank, code in enumerate(present.tolist())}
+            self._trigrams = (grams[starts], np.append(starts, len(grams)), owner)
+        return self._trigrams
+
+    def _lookup(self, gram: str) -> np.ndarray:
+        """Codes of the distinct values containing a (lower-case) trigram"""
+        keys, starts, owner = self._index()
+        if any(char not in self._alphabet for char in gram):
+            return owner[:0]
+        size = max(len(self._alphabet), 1)
+        key = (self._alphabet[gram[0]] * size + self._alphabet[gram[1]]) * size + self._alphabet[gram[2]]
+        slot = np.searchsorted(keys, key)
+        if slot == len(keys) or keys[slot] != key:
+            return owner[:0]
+        return owner[starts[slot]:starts[slot + 1]]
+
+    def mask(self, pattern: str) -> np.ndarray:
+        literal = not _REGEX_CHARS.search(pattern)
+        if not literal:
+            try:
+                re.compile(pattern)
+            except re.error:
+                literal = True
+            else:
+                return self.series.str.contains(pattern, na=False).to_numpy(dtype=bool)
+        if len(pattern) < TRIGRAM:
+            return self.series.str.contains(pattern, regex=False, na=False).to_numpy(dtype=bool)
+
+        lowered = pattern.lower()
+        candidates = None
+        for gram in {lowered[i:i + TRIGRAM] for i in range(len(lowered) - TRIGRAM + 1)}:
+            found = self._lookup(gram)
+            candidates = found if candidates is None else np.intersect1d(candidates, found, assume_unique=True)
+        # The extra last slot is picked up by missing values (code -1)
+        matched = np.zeros(len(self._values) + 1, dtype=bool)
+        found = self._values.iloc[candidates].str.contains(pattern, regex=False).to_numpy(dtype=bool)
+        matched[candidates[found]] = True
+        return matched[self._codes]
+
+
+def column_kind(series: pd.Series) -> str:
+    """
+    Decides which widget and index a column gets
+
+    Args:
+        series (pd.Series): Column to filter
+
+    Returns:
+        str: ``"category"``, ``"numeric"``, ``"datetime"`` or ``"text"``
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype) or series.nunique() < CATEGORY_THRESHOLD:
+        return 'category'
+    if is_numeric_dtype(series):
+        return 'numeric'
+    if is_datetime64_any_dtype(series):
+        return 'datetime'
+    return 'text'
+
+
+def build_index(series: pd.Series):
+    """
+    Builds the lookup structure for one column, reusing it while the column's contents are unchanged
+
+    Args:
+        series (pd.Series): Column to filter
+
+    Returns:
+        CategoryIndex | SortedIndex | TextIndex: Index for the column
+    """
+    digest = hashlib.sha1(pd.util.hash_pandas_object(series, index=False).to_numpy().tobytes())
+    return _columns.get((series.name, str(series.dtype), digest.hexdigest()), lambda: _build_index(series))
+
+
+def _build_index(series: pd.Series):
+    if is_datetime64_any_dtype(series) and getattr(series.dt, 'tz', None) is not None:
+        series = series.dt.tz_localize(None)
+    kind = column_kind(series)
+    if kind == 'category':
+        return CategoryIndex(series)
+    if kind == 'text':
+        return TextIndex(series)
+    return SortedIndex(series, kind)
+
+
+class FilterEngine:
+    """Column indexes for one version of a frame; selections become a single combined mask"""
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._indexes = {}
+
+    def column(self, name: str):
+        """Index for a column, built on first use"""
+        if name not in self._indexes:
+            self._indexes[name] = build_index(self.df[name])
+        return self._indexes[name]
+
+    def mask(self, selections: dict) -> np.ndarray:
+        """
+        Combines the per-column selections into one boolean row mask
+
+        Args:
+            selections (dict): Column to selected values (list), bounds (tuple) or pattern (str)
+
+        Returns:
+            np.ndarray: True for the rows that pass every selection
+        """
+        mask = np.ones(len(self.df), dtype=bool)
+        for column, selected in selections.items():
+            mask &= self.column(column).mask(selected)
+        return mask
+
+    def apply(self, selections: dict) -> pd.DataFrame:
+        """Rows of the frame that pass every selection, taken in one step"""
+        if not selections:
+            return self.df
+        mask = self.mask(selections)
+        return self.df if mask.all() else self.df.iloc[np.flatnonzero(mask)]
+
+
+def get_engine(df: pd.DataFrame) -> FilterEngine:
+    """
+    Returns the filter engine for a frame, shared by every call with the same data version
+
+    Args:
+        df (pd.DataFrame): Frame to filter; frames without ``attrs["version"]`` get a fresh engine
+
+    Returns:
+        FilterEngine: Engine over the frame
+    """
+    version = df.attrs.get("version")
+    if version is None:
+        return FilterEngine(df)
+    return _engines.get(version, lambda: FilterEngine(df))
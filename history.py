@@ -0,0 +1,284 @@
+import gzip
+import json
+import os
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+import journal
+from memo import SharedMemo
+
+# Saves replayed on top of a base snapshot before a fresh base is written
+REBASE_EVERY = 500
+
+_lock = threading.RLock()
+_entries = {}
+_frames = SharedMemo(4)
+_diffs = SharedMemo(16)
+
+
+def history_dir(path: str) -> str:
+    """Directory holding the history of a tracker file, e.g. folder/out.history"""
+    return os.path.splitext(path)[0] + '.history'
+
+
+def _combine(entries: list) -> dict:
+    """
+    Folds consecutive saves into one change set with the same effect
+
+    Later cells win; a deletion drops the cells written before it, and a row written after its
+    deletion comes back with just the later cells, as it did when the saves were replayed.
+    """
+    cells, deleted = {}, []
+    for entry in entries:
+        for label in entry.get('deleted', []):
+            cells.pop(label, None)
+            deleted.append(label)
+        for label, row in entry.get('upserts', []):
+            cells.setdefault(label, {}).update(row)
+    return {'upserts': [[label, row] for label, row in cells.items()], 'deleted': list(dict.fromkeys(deleted))}
+
+
+class History:
+    """
+    Past versions of a tracker, kept as base snapshots plus one compressed delta per save
+
+    A base is the full frame at one store revision, written as a zstd-compressed Arrow file.
+    Every save after it appends its committed change set (only the cells written and the rows
+    deleted) to ``deltas.jsonl.gz`` as its own gzip member. A version is rebuilt from the
+    nearest base before it plus the deltas in between, folded into a single change set, so
+    no version is ever stored whole except the bases; a new base is written every
+    ``REBASE_EVERY`` saves and whenever the whole tracker is replaced.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.deltas = os.path.join(directory, 'deltas.jsonl.gz')
+
+    def _base_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f'base-{seq:08d}.feather')
+
+    def bases(self) -> list:
+        """Revisions that have a base snapshot, oldest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(int(name[5:-8]) for name in os.listdir(self.directory)
+                      if name.startswith('base-') and name.endswith('.feather'))
+
+    def started(self) -> bool:
+        return bool(self.bases())
+
+    def _write_base(self, seq: int, frame: pd.DataFrame) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        target = self._base_path(seq)
+        frame = frame.copy(deep=False)
+        frame.attrs.clear()
+        feather.write_feather(pa.Table.from_pandas(frame, preserve_index=True), target + '.tmp', compression='zstd')
+        os.replace(target + '.tmp', target)
+
+    def _append(self, entry: dict) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        line = json.dumps(entry, default=journal._json_default, ensure_ascii=False) + '\n'
+        with open(self.deltas, 'ab') as handle:
+            handle.write(gzip.compress(line.encode('utf-8')))
+
+    def start(self, seq: int, frame: pd.DataFrame, ts=None) -> None:
+        """
+        Starts the history from the current state of the tracker, unless it was started already
+
+        Args:
+            seq (int): Store revision of ``frame``
+            frame (pd.DataFrame): Full tracker frame
+            ts (optional): When the tracker got this state. Defaults to now.
+        """
+        with _lock:
+            if not self.started():
+                self._write_base(seq, frame)
+                self._append({'seq': seq, 'ts': _now(ts), 'base': len(frame)})
+
+    def record(self, seq: int, changes: dict, frame=None, ts=None) -> None:
+        """
+        Appends one save to the history
+
+        Args:
+            seq (int): Store revision the save created
+            changes (dict): The committed change set (after conflicts were taken out)
+            frame (callable, optional): Returns the full frame after the save; called only when
+                a fresh base is due. Defaults to None, which never rebases.
+            ts (optional): When the save happened. Defaults to now.
+        """
+        with _lock:
+            self._append({'seq': seq, 'ts': _now(ts), 'upserts': changes.get('upserts', []),
+                          'deleted': changes.get('deleted', [])})
+            since = [entry for entry in self.entries() if entry['seq'] > self.bases()[-1]] if self.started() else []
+            if frame is not None and len(since) >= REBASE_EVERY:
+                self._write_base(seq, frame())
+
+    def rebase(self, seq: int, frame: pd.DataFrame, ts=None) -> None:
+        """Records that the whole tracker was replaced by ``frame`` at revision ``seq``"""
+        with _lock:
+            self._write_base(seq, frame)
+            self._append({'seq': seq, 'ts': _now(ts), 'base': len(frame)})
+
+    def entries(self) -> list:
+        """
+        Every recorded save, oldest first, reading only what was appended since the last call
+
+        Returns:
+            list: Dicts with ``seq``, ``ts`` and either ``upserts``/``deleted`` or ``base``
+            (the row count of a base snapshot)
+        """
+        with _lock:
+            cached = _entries.get(self.directory)
+            size = os.path.getsize(self.deltas) if os.path.exists(self.deltas) else 0
+            if cached is None or size < cached['offset']:
+                cached = _entries[self.directory] = {'offset': 0, 'entries': []}
+            if size > cached['offset']:
+                with open(self.deltas, 'rb') as handle:
+                    handle.seek(cached['offset'])
+                    data = handle.read(size - cached['offset'])
+                # Every save is its own gzip member, so reading can start at any member boundary
+                text = gzip.decompress(data).decode('utf-8')
+                cached['entries'] += [json.loads(line) for line in text.splitlines() if line.strip()]
+                cached['offset'] = size
+            return list(cached['entries'])
+
+    def versions(self) -> pd.DataFrame:
+        """
+        One row per recorded version
+
+        Returns:
+            pd.DataFrame: ``seq``, ``ts`` (UTC), ``rows`` written or deleted, and ``kind``
+            (``"save"`` or ``"base"``), oldest first
+        """
+        entries = self.entries()
+        return pd.DataFrame({
+            'seq': pd.array([entry['seq'] for entry in entries], dtype='int64'),
+            'ts': pd.to_datetime([entry['ts'] for entry in entries], utc=True, format='ISO8601'),
+            'rows': pd.array([entry['base'] if 'base' in entry else len(entry['upserts']) + len(entry['deleted'])
+                              for entry in entries], dtype='int64'),
+            'kind': ['base' if 'base' in entry else 'save' for entry in entries],
+        })
+
+    def seq_at(self, when) -> int:
+        """
+        The revision the tracker had at a moment
+
+        Args:
+            when: Timestamp; naive ones are taken as UTC
+
+        Returns:
+            int | None: Last revision saved at or before ``when``; None before the history started
+        """
+        when = pd.Timestamp(when)
+        when = when.tz_localize('UTC') if when.tzinfo is None else when.tz_convert('UTC')
+        versions = self.versions()
+        before = versions[versions['ts'] <= when]
+        return int(before['seq'].iloc[-1]) if len(before) else None
+
+    def frame_at(self, seq: int) -> pd.DataFrame:
+        """
+        Rebuilds the tracker as it was at a revision
+
+        The nearest base at or before ``seq`` is read and the saves after it are folded into one
+        change set and applied at once. The last few rebuilt versions are kept.
+
+        Args:
+            seq (int): Store revision
+
+        Returns:
+            pd.DataFrame: Full tracker frame at that revision; ``attrs["rev"]`` is ``seq``
+        """
+        return _frames.get((self.directory, seq), lambda: self._rebuild(seq)).copy(deep=False)
+
+    def _rebuild(self, seq: int) -> pd.DataFrame:
+        bases = [base for base in self.bases() if base <= seq]
+        if not bases:
+            raise ValueError(f"No history before revision {seq} in {self.directory}")
+        frame = feather.read_table(self._base_path(bases[-1])).to_pandas()
+        saves = [entry for entry in self.entries() if bases[-1] < entry['seq'] <= seq and 'base' not in entry]
+        frame = journal.apply_changeset(frame, _combine(saves))
+        frame.attrs["rev"] = seq
+        return frame
+
+    def diff(self, start: int, end: int) -> pd.DataFrame:
+        """
+        Cells that differ between two revisions
+
+        Only the rows and columns the saves in between wrote are compared, so the cost follows
+        the size of the change rather than the size of the tracker; across a replace the whole
+        frames are compared. Past revisions never change, so recent diffs are kept.
+
+        Args:
+            start (int): Earlier revision
+            end (int): Later revision
+
+        Returns:
+            pd.DataFrame: ``row``, ``column``, ``before``, ``after`` and ``change`` (``"added"``,
+            ``"deleted"`` or ``"changed"``); deleted and added rows get one line each
+        """
+        start, end = min(start, end), max(start, end)
+        return _diffs.get((self.directory, start, end), lambda: self._diff(start, end)).copy(deep=False)
+
+    def _diff(self, start: int, end: int) -> pd.DataFrame:
+        columns = ['row', 'column', 'before', 'after', 'change']
+        between = [entry for entry in self.entries() if start < entry['seq'] <= end]
+        if any('base' in entry for entry in between):
+            # The tracker was replaced in between: every row may have changed
+            labels, written = None, None
+        else:
+            labels = pd.Index(journal.touched(_combine(between))).unique()
+            written = {column for entry in between for _, row in entry.get('upserts', []) for column in row}
+        if labels is not None and not len(labels):
+            return pd.DataFrame(columns=columns)
+        before, after = self.frame_at(start), self.frame_at(end)
+        if labels is None:
+            labels = before.index.union(after.index)
+            written = set(before.columns).union(after.columns)
+
+        lines = []
+        for label in labels.difference(after.index).intersection(before.index):
+            lines.append((label, None, None, None, 'deleted'))
+        for label in labels.difference(before.index).intersection(after.index):
+            lines.append((label, None, None, None, 'added'))
+        kept = labels.intersection(before.index).intersection(after.index)
+        for column in sorted(written, key=str):
+            old = before[column].reindex(kept).astype(object) if column in before.columns else pd.Series(None, index=kept, dtype=object)
+            new = after[column].reindex(kept).astype(object) if column in after.columns else pd.Series(None, index=kept, dtype=object)
+            changed = ~((old == new) | (old.isna() & new.isna())).to_numpy(dtype=bool)
+            lines += [(label, column, a, b, 'changed') for label, a, b in zip(kept[changed], old[changed], new[changed])]
+        return pd.DataFrame(lines, columns=columns).sort_values(['row', 'column'], na_position='first', kind='stable', ignore_index=True)
+
+    def restore_changes(self, seq: int, current: int) -> dict:
+        """
+        Change set that brings the tracker back to how it was at a revision
+
+        It is derived from :meth:`diff`, so only the rows changed since are written. Restoring
+        is saved like any other edit: it is journaled, logged as state transitions and can
+        itself be undone.
+
+        Args:
+            seq (int): Revision to go back to
+            current (int): Revision the tracker is at now
+
+        Returns:
+            dict: Change set for :meth:`storage.TrackerStore.save`
+        """
+        target = self.frame_at(seq)
+        cells, deleted = {}, []
+        for label, column, before, _, change in self.diff(seq, current).itertuples(index=False):
+            label = journal.as_label(label)
+            if change == 'added':
+                deleted.append(label)
+            elif change == 'deleted':
+                cells[label] = {col: value for col, value in target.loc[label].items() if not pd.isna(value)}
+            else:
+                cells.setdefault(label, {})[column] = None if pd.isna(before) else before
+        return {'upserts': [[label, row] for label, row in cells.items()], 'deleted': deleted, 'added': []}
+
+
+def _now(ts=None) -> str:
+    ts = pd.Timestamp.now(tz='UTC') if ts is None else pd.Timestamp(ts)
+    return (ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC')).isoformat()
@@ -0,0 +1,202 @@
+import argparse
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from journal import as_label, next_label
+from projects import get_project
+from schema import EFFORT_COLUMN, ID_COLUMN, INDEX_ARTIFACT, TRACKER_COLUMNS, effort_levels as parse_effort
+from storage import get_store
+from transitions import save_with_transitions
+from urls import effort_levels
+
+IMPORT_PATH = 'folder/MDWFP_import.csv'
+
+# Rows read, cleaned and saved at a time; memory use is bounded by one chunk
+CHUNK_ROWS = 10_000
+
+# Inventory column names to tracker column names; the inventory's guidance is the tracker's notes
+RENAMES = {'URL': 'Legacy URL', 'Assignment': 'Users', 'Content Guidance': 'Notes'}
+KEY_COLUMN = 'Legacy URL'
+
+
+@dataclass
+class ImportSummary:
+    """What an import did to the tracker"""
+
+    read: int = 0
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    skipped: int = 0
+    ignored: list = field(default_factory=list)
+
+
+def clean_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """
+    Brings one chunk of a site inventory into tracker shape
+
+    Index artifact columns (``Unnamed: 0.3`` ...) and page ids of tracker exports are dropped,
+    header names are stripped (``Jira Epic `` becomes ``Jira Epic``) and renamed by ``RENAMES``
+    (``URL``, ``Assignment`` and ``Content Guidance`` become ``Legacy URL``, ``Users`` and
+    ``Notes``), and blank cells become missing. Columns that end up with the same name are
+    merged, the later one winning where both have a value. Columns the tracker has no place
+    for are dropped (see :func:`ignored_columns`). The effort level is computed from the legacy
+    URL where the inventory has none. Rows are
+    matched to pages by legacy URL; new pages get their ids when they are saved.
+
+    Args:
+        chunk (pd.DataFrame): Rows as read from the inventory CSV
+
+    Returns:
+        pd.DataFrame: Rows with tracker column names; rows without a URL are dropped
+    """
+    dropped = [col for col in chunk.columns if INDEX_ARTIFACT.match(str(col).strip()) or str(col).strip() == ID_COLUMN]
+    chunk = chunk.drop(columns=dropped)
+    chunk = chunk.rename(columns=_tracker_name)
+    chunk = chunk.loc[:, chunk.columns.isin(TRACKER_COLUMNS)]
+    chunk = chunk.apply(lambda col: col.str.strip()).replace('', pd.NA)
+    merged = {}
+    for position, col in enumerate(chunk.columns):
+        values = chunk.iloc[:, position]
+        merged[col] = values.fillna(merged[col]) if col in merged else values
+    chunk = pd.DataFrame(merged, index=chunk.index)
+    if KEY_COLUMN not in chunk.columns:
+        raise ValueError(f"Import has no {KEY_COLUMN!r} (or 'URL') column")
+    chunk = chunk.dropna(subset=[KEY_COLUMN]).drop_duplicates(subset=[KEY_COLUMN], keep='last')
+    effort = effort_levels(chunk[KEY_COLUMN])
+    if EFFORT_COLUMN in chunk.columns:
+        effort = parse_effort(chunk[EFFORT_COLUMN]).fillna(effort)
+    return chunk.assign(**{EFFORT_COLUMN: effort})
+
+
+def _tracker_name(column) -> str:
+    column = str(column).strip()
+    return RENAMES.get(column, column)
+
+
+def ignored_columns(columns) -> list:
+    """
+    Inventory columns an import leaves out because the tracker has no column for them
+
+    Args:
+        columns: Header of the inventory CSV
+
+    Returns:
+        list: The column names as written in the inventory, index artifacts and page ids aside
+    """
+    return [col for col in columns
+            if _tracker_name(col) not in TRACKER_COLUMNS and _tracker_name(col) != ID_COLUMN
+            and not INDEX_ARTIFACT.match(str(col).strip())]
+
+
+def read_chunks(path: str = IMPORT_PATH, chunk_rows: int = CHUNK_ROWS):
+    """
+    Streams a site inventory CSV as cleaned chunks
+
+    Args:
+        path (str, optional): Inventory CSV. Defaults to ``folder/MDWFP_import.csv``.
+        chunk_rows (int, optional): Rows per chunk. Defaults to ``CHUNK_ROWS``.
+
+    Yields:
+        tuple: ``(rows_read, chunk)``, the number of raw rows and the cleaned chunk
+    """
+    with pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunk_rows, encoding='utf-8-sig') as reader:
+        for chunk in reader:
+            yield len(chunk), clean_chunk(chunk)
+
+
+def changes_for_chunk(chunk: pd.DataFrame, tracker: pd.DataFrame, labels: dict, first_free: int,
+                      overwrite: bool = False) -> tuple:
+    """
+    Turns a cleaned chunk into a change set keyed on tracker row labels
+
+    Rows are matched on the legacy URL. New URLs become new rows. For known URLs only the
+    cells the tracker has no value for are filled, so an import never undoes work done in
+    the tracker, unless ``overwrite`` is set.
+
+    Args:
+        chunk (pd.DataFrame): Output of :func:`clean_chunk`
+        tracker (pd.DataFrame): Current tracker rows
+        labels (dict): Legacy URL to row label; new rows are added to it
+        first_free (int): First unused row label
+        overwrite (bool, optional): Replace existing values with the inventory's. Defaults to False.
+
+    Returns:
+        tuple: ``(changes, inserted, updated)``
+    """
+    known = pd.array([labels.get(url) for url in chunk[KEY_COLUMN].tolist()], dtype='Int64')
+    fresh = chunk[known.isna()]
+    added = list(range(first_free, first_free + len(fresh)))
+    labels.update(zip(fresh[KEY_COLUMN].tolist(), added))
+    upserts = _upserts(added, fresh, fresh.notna().to_numpy())
+
+    existing = chunk[~known.isna()]
+    existing.index = pd.Index(known[~known.isna()].to_numpy(), dtype=tracker.index.dtype)
+    existing = existing[existing.index.isin(tracker.index)]
+    current = tracker.reindex(index=existing.index, columns=existing.columns)
+    wanted = existing.notna().to_numpy() & current.isna().to_numpy()
+    if overwrite:
+        wanted |= existing.notna().to_numpy() & (existing.astype(str).to_numpy() != current.astype(str).to_numpy())
+    rows = wanted.any(axis=1)
+    upserts += _upserts(existing.index[rows], existing[rows], wanted[rows])
+    return {'upserts': upserts, 'deleted': [], 'added': added}, len(added), int(rows.sum())
+
+
+def _upserts(labels, rows: pd.DataFrame, keep) -> list:
+    """Change set upserts holding the cells of ``rows`` where ``keep`` is set"""
+    columns = list(rows.columns)
+    return [
+        [as_label(label), {col: value for col, value, wanted in zip(columns, values, mask) if wanted}]
+        for label, values, mask in zip(labels, rows.to_numpy(dtype=object), keep)
+    ]
+
+
+def import_inventory(path: str = IMPORT_PATH, store=None, chunk_rows: int = CHUNK_ROWS,
+                     overwrite: bool = False, project: str = None) -> ImportSummary:
+    """
+    Imports a site inventory into the tracker, one chunk and one save at a time
+
+    Only one chunk of the inventory is held in memory, so crawls of millions of URLs can be
+    imported. Running the same import twice changes nothing the second time.
+
+    Args:
+        path (str, optional): Inventory CSV. Defaults to ``folder/MDWFP_import.csv``.
+        store (storage.TrackerStore, optional): Store to import into. Defaults to the project's store.
+        chunk_rows (int, optional): Rows per chunk. Defaults to ``CHUNK_ROWS``.
+        overwrite (bool, optional): Replace values already in the tracker. Defaults to False.
+        project (str, optional): Key of the project to import into. Defaults to the first registered project.
+
+    Returns:
+        ImportSummary: Counts of the rows read, inserted, updated, unchanged and skipped, and
+        the inventory columns that were left out
+    """
+    project = get_project(project)
+    store = store or get_store(project=project)
+    tracker = store.load()
+    labels = {}
+    if KEY_COLUMN in tracker.columns:
+        urls = tracker[KEY_COLUMN].dropna()
+        labels = dict(zip(urls.str.strip(), (as_label(label) for label in urls.index)))
+
+    header = pd.read_csv(path, nrows=0, encoding='utf-8-sig').columns
+    summary = ImportSummary(ignored=ignored_columns(header))
+    for read, chunk in read_chunks(path, chunk_rows):
+        changes, inserted, updated = changes_for_chunk(chunk, tracker, labels, next_label(tracker), overwrite)
+        summary.read += read
+        summary.skipped += read - len(chunk)
+        summary.inserted += inserted
+        summary.updated += updated
+        summary.unchanged += len(chunk) - inserted - updated
+        if changes['upserts']:
+            tracker = save_with_transitions(store, changes, user='import', path=project.log_path).frame
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import a site inventory CSV into the migration tracker")
+    parser.add_argument('path', nargs='?', default=IMPORT_PATH)
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--overwrite', action='store_true', help="replace values already in the tracker")
+    parser.add_argument('--project', help="key of the project to import into, as registered in projects.json")
+    print(import_inventory(**vars(parser.parse_args())))
@@ -0,0 +1,304 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from schema import apply_schema
+
+
+def journal_path(path: str) -> str:
+    """Path of the append-only change journal kept next to a tracker CSV"""
+    return path + '.journal'
+
+
+def as_label(value):
+    """Row labels as plain Python values so they survive a JSON round trip"""
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _json_default(value):
+    if hasattr(value, 'item'):
+        return value.item()
+    if pd.isna(value):
+        return None
+    return str(value)
+
+
+def build_changeset(editor_state: dict, labels: pd.Index, next_label: int) -> dict:
+    """
+    Turns a data editor edit delta into a change set keyed on row labels
+
+    The editor reports edited and deleted rows by position in the frame it was given, so the
+    positions are mapped back to that frame's row labels. Added rows get fresh labels starting
+    at ``next_label``.
+
+    Args:
+        editor_state (dict): ``edited_rows`` / ``added_rows`` / ``deleted_rows`` from the editor's
+            session state entry
+        labels (pd.Index): Row labels of the frame that was passed to ``st.data_editor``, in order
+        next_label (int): First unused row label of the full tracker
+
+    Returns:
+        dict: ``{"upserts": [[label, {column: value}], ...], "deleted": [label, ...],
+        "added": [label, ...]}``
+    """
+    editor_state = editor_state or {}
+    upserts = [
+        [as_label(labels[int(position)]), dict(cells)]
+        for position, cells in editor_state.get('edited_rows', {}).items()
+    ]
+    added = [next_label + offset for offset in range(len(editor_state.get('added_rows', [])))]
+    upserts += [[label, dict(cells)] for label, cells in zip(added, editor_state.get('added_rows', []))]
+    deleted = [as_label(labels[int(position)]) for position in editor_state.get('deleted_rows', [])]
+    return {'upserts': upserts, 'deleted': deleted, 'added': added}
+
+
+def bulk_changeset(df: pd.DataFrame, labels, values: dict) -> dict:
+    """
+    Change set that sets the same cells on many rows at once
+
+    The rows are compared with the values one column at a time; rows that already hold every
+    value are left out, so they are neither saved nor logged as state transitions.
+
+    Args:
+        df (pd.DataFrame): Tracker rows holding at least the columns in ``values``
+        labels: Row labels to set
+        values (dict): Column to the value every row gets
+
+    Returns:
+        dict: Change set in the form of :func:`build_changeset`
+    """
+    labels = pd.Index(labels).intersection(df.index)
+    differs = np.zeros(len(labels), dtype=bool)
+    for column, value in values.items():
+        if column not in df.columns:
+            differs[:] = True
+            continue
+        current = df[column].reindex(labels).astype(object)
+        same = current.isna() if pd.isna(value) else current.eq(value)
+        differs |= ~same.to_numpy(dtype=bool)
+    return {'upserts': [[label, dict(values)] for label in labels[differs].tolist()], 'deleted': [], 'added': []}
+
+
+def coerce_changeset(changes: dict) -> dict:
+    """
+    Converts the cells of a change set to the values the tracker schema stores
+
+    Stores run this before a change set is journaled or committed. A value the tracker
+    cannot hold, such as an effort level of 200, is then saved as missing. Without it, the
+    value would be written in a form that fails every later load.
+
+    Args:
+        changes (dict): Change set from :func:`build_changeset`
+
+    Returns:
+        dict: The same change set with plain, schema-typed cell values (None when missing)
+
+    Raises:
+        ValueError: A column's values cannot be converted at all
+    """
+    upserts = [[label, dict(row)] for label, row in changes.get('upserts', [])]
+    cells = {}
+    for position, (_, row) in enumerate(upserts):
+        for column, value in row.items():
+            cells.setdefault(column, []).append((position, value))
+    for column, written in cells.items():
+        try:
+            values = apply_schema(pd.DataFrame({column: [value for _, value in written]}))[column]
+        except (TypeError, ValueError) as error:
+            raise ValueError(f"Values for {column!r} do not fit the tracker: {error}") from error
+        for (position, _), value in zip(written, values.astype(object)):
+            upserts[position][1][column] = None if pd.isna(value) else as_label(value)
+    return dict(changes, upserts=upserts)
+
+
+def touched(changes: dict) -> list:
+    """Labels of every row a change set writes or deletes"""
+    return [label for label, _ in changes.get('upserts', [])] + list(changes.get('deleted', []))
+
+
+def resolve_conflicts(changes: dict, revisions: dict, base, existing, next_free: int) -> tuple:
+    """
+    Splits a change set into the rows that can be committed and the rows that conflict
+
+    A row conflicts when its revision is newer than ``base``, i.e. somebody else saved or
+    deleted it after the editing session loaded its data. Only the rows in the change set are
+    looked at. Added rows never conflict; if their label was taken in the meantime they are
+    moved to the next free label.
+
+    Args:
+        changes (dict): Change set from :func:`build_changeset`
+        revisions (dict): Current revision per row label; rows never saved may be missing
+        base: Store revision the session loaded, or None to skip the check
+        existing: Container of the row labels currently in use
+        next_free (int): First unused row label of the full tracker
+
+    Returns:
+        tuple: ``(changes_to_commit, conflicting_labels)``
+    """
+    def newer(label) -> bool:
+        return base is not None and revisions.get(label, 0) > base
+
+    added = set(changes.get('added', []))
+    upserts, relabelled, conflicts = [], [], []
+    for label, row in changes.get('upserts', []):
+        if label in added:
+            if label in existing or label in revisions:
+                label, next_free = next_free, next_free + 1
+            relabelled.append(label)
+        elif newer(label):
+            conflicts.append(label)
+            continue
+        upserts.append([label, row])
+
+    deleted = []
+    for label in changes.get('deleted', []):
+        if newer(label):
+            conflicts.append(label)
+        else:
+            deleted.append(label)
+    return {'upserts': upserts, 'deleted': deleted, 'added': relabelled}, conflicts
+
+
+def next_label(df: pd.DataFrame) -> int:
+    """First row label not used by the tracker frame"""
+    return int(df.index.max()) + 1 if len(df) else 0
+
+
+def is_empty(changes: dict) -> bool:
+    """True when a change set would not modify anything"""
+    return not changes.get('upserts') and not changes.get('deleted')
+
+
+def apply_changeset(df: pd.DataFrame, changes: dict, exclude=()) -> pd.DataFrame:
+    """
+    Applies a change set to a tracker frame
+
+    Upserts and deletions are keyed on row labels (page ids), so applying the same change set
+    twice gives the same result. Cells are assigned one column at a time for all changed rows,
+    found through the frame's hashed index; the rest of the frame is left untouched.
+
+    Args:
+        df (pd.DataFrame): Tracker rows
+        changes (dict): Change set from :func:`build_changeset`
+        exclude (optional): Columns whose cells are skipped, e.g. because they are not loaded
+            yet; rows are still added and deleted. Defaults to none.
+
+    Returns:
+        pd.DataFrame: New frame with the changes applied
+    """
+    # Cells are assigned on a shallow copy: with copy-on-write only the columns written to are
+    # copied, and the caller's frame is left as it was
+    df = df.copy(deep=False)
+    deleted = changes.get('deleted', [])
+    if deleted:
+        df = df.drop(index=deleted, errors='ignore')
+
+    upserts = changes.get('upserts', [])
+    new_labels = pd.Index([label for label, _ in upserts]).unique().difference(df.index)
+    if len(new_labels):
+        df = df.reindex(df.index.append(new_labels))
+
+    exclude = set(exclude)
+    cells = [
+        (label, column, value)
+        for label, row in upserts
+        for column, value in row.items()
+        if column not in exclude
+    ]
+    if not cells:
+        return df
+
+    cells = pd.DataFrame(cells, columns=['label', 'column', 'value'])
+
+    for column, group in cells.groupby('column', sort=False):
+        labels = pd.Index(group['label'])
+        _assign(df, column, labels, group['value'].to_numpy())
+    return df
+
+
+def apply_rows(df: pd.DataFrame, rows: pd.DataFrame, deleted=()) -> pd.DataFrame:
+    """
+    Writes whole rows into a tracker frame, one column at a time
+
+    Same effect as :func:`apply_changeset` with every cell of ``rows`` as an upsert, without
+    building the change set cell by cell; used to catch up with many saved rows at once.
+
+    Args:
+        df (pd.DataFrame): Tracker rows
+        rows (pd.DataFrame): Rows to write, labelled by page id
+        deleted (optional): Labels of rows to drop. Defaults to none.
+
+    Returns:
+        pd.DataFrame: New frame with the rows written
+    """
+    df = df.copy(deep=False)
+    if len(deleted):
+        df = df.drop(index=deleted, errors='ignore')
+    new_labels = rows.index.unique().difference(df.index)
+    if len(new_labels):
+        df = df.reindex(df.index.append(new_labels))
+    if len(rows):
+        for column in rows.columns:
+            _assign(df, column, rows.index, rows[column].to_numpy())
+    return df
+
+
+def _assign(df: pd.DataFrame, column: str, labels: pd.Index, raw) -> None:
+    """Assigns raw values to one column of the given rows, in place, converting them by the schema"""
+    values = apply_schema(pd.DataFrame({column: raw}, index=labels))[column]
+    current = df[column].dtype if column in df.columns else None
+    if isinstance(current, pd.CategoricalDtype):
+        missing = sorted(set(values.dropna()) - set(current.categories))
+        if missing:
+            df[column] = df[column].cat.add_categories(missing)
+        values = values.astype(object)
+    elif current is None:
+        df[column] = pd.Series(index=df.index, dtype=values.dtype)
+    df.loc[labels, column] = values.to_numpy()
+
+
+def append_entry(path: str, changes: dict) -> None:
+    """
+    Appends a change set to the journal of a tracker CSV as one JSON line
+
+    Args:
+        path (str): Path to the tracker CSV
+        changes (dict): Change set from :func:`build_changeset`
+    """
+    entry = dict(changes, ts=pd.Timestamp.now(tz='UTC').isoformat())
+    line = json.dumps(entry, default=_json_default, ensure_ascii=False) + '\n'
+    with open(journal_path(path), 'a', encoding='utf-8') as handle:
+        handle.write(line)
+
+
+def read_entries(path: str, offset: int = 0) -> tuple:
+    """
+    Reads the journal entries written after a byte offset
+
+    A partially written last line is left for the next read.
+
+    Args:
+        path (str): Path to the tracker CSV
+        offset (int, optional): Byte offset already consumed. Defaults to 0.
+
+    Returns:
+        tuple: ``(entries, new_offset)``
+    """
+    journal = journal_path(path)
+    if not os.path.exists(journal):
+        return [], 0
+    with open(journal, 'rb') as handle:
+        handle.seek(offset)
+        data = handle.read()
+    complete = data[:data.rfind(b'\n') + 1]
+    entries = [json.loads(line) for line in complete.splitlines() if line.strip()]
+    return entries, offset + len(complete)
+
+
+def truncate(path: str) -> None:
+    """Empties the journal of a tracker CSV after its entries were compacted into the CSV"""
+    journal = journal_path(path)
+    if os.path.exists(journal):
+        os.remove(journal)
@@ -0,0 +1,316 @@
+import hashlib
+import logging
+import os
+import threading
+
+import pandas as pd
+
+import journal
+import snapshot
+from history import History, history_dir
+from schema import ID_COLUMN, empty_tracker, read_tracker_csv
+
+# Sessions share one parsed frame, so every view handed out must copy on write
+# instead of mutating the cached original (always on from pandas 3.0).
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+LOGGER = logging.getLogger(__name__)
+
+DATA_PATH = 'folder/out.csv'
+
+# Journal entries replayed on top of the CSV before it gets rewritten as a whole
+COMPACT_EVERY = 200
+
+_lock = threading.RLock()
+_cache = {}
+
+
+def file_signature(path: str) -> tuple:
+    """
+    Builds the cache key for a data file from its modification time, size and content hash
+
+    The content hash is only recomputed when the modification time or size moved,
+    so an unchanged file costs a single ``os.stat`` per call. A new process takes the
+    signature recorded in the file's snapshot when the time and size still match.
+
+    Args:
+        path (str): Path to the data file
+
+    Returns:
+        tuple: ``(mtime_ns, size, sha1)`` of the file
+    """
+    stat = os.stat(path)
+    cached = _cache.get(path)
+    if cached is not None and cached["signature"][:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached["signature"]
+    recorded = snapshot.recorded_signature(path)
+    if recorded is not None and recorded[:2] == (stat.st_mtime_ns, stat.st_size):
+        return recorded
+
+    digest = hashlib.sha1()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(1 << 20), b''):
+            digest.update(block)
+    return (stat.st_mtime_ns, stat.st_size, digest.hexdigest())
+
+
+def load_tracker(path: str = DATA_PATH, columns: list = None) -> pd.DataFrame:
+    """
+    Returns the tracker frame, parsing the CSV at most once per file version per process
+
+    When the columnar snapshot next to the CSV was written from the same CSV, it is
+    memory-mapped instead of parsing the CSV, and only the requested columns are read from it;
+    other columns are read the first time a caller asks for them. Otherwise the CSV is parsed
+    and the snapshot written for the next process. Saved changes that are still in the journal
+    are replayed on top; only entries appended since the previous call are read. A tracker
+    that was never saved loads as an empty frame; nothing is written until the first save.
+
+    Args:
+        path (str, optional): Path to the tracker CSV. Defaults to ``folder/out.csv``.
+        columns (list, optional): Columns the caller needs; an empty list gives just the rows.
+            Defaults to None, every column.
+
+    Returns:
+        pd.DataFrame: Copy-on-write view of the shared frame; edits made by the caller never
+        reach the cached original. A view of only some of the columns has its own version.
+    """
+    with _lock:
+        if not os.path.exists(path):
+            _cache.pop(path, None)
+            return _empty_view(path, columns)
+        signature = file_signature(path)
+        cached = _cache.get(path)
+        if cached is None or cached["signature"][2] != signature[2]:
+            table = snapshot.open_snapshot(path, signature)
+            if table is None:
+                frame = read_tracker_csv(path)
+                snapshot.write_snapshot(frame, path, signature)
+            else:
+                frame = snapshot.read_columns(table, columns)
+            cached = _cache[path] = {
+                "signature": signature, "frame": frame, "offset": 0, "entries": 0, "seq": 0, "revs": {},
+                "table": table, "replayed": [],
+            }
+        else:
+            # Same content under a new mtime (e.g. touched); keep the parsed frame.
+            cached["signature"] = signature
+
+        entries, offset = journal.read_entries(path, cached["offset"])
+        for changes in entries:
+            seq = changes.get("seq", cached["seq"] + 1)
+            if "revs" in changes:
+                # Header written when the journal was folded into the CSV
+                cached["revs"] = dict(changes["revs"])
+            else:
+                try:
+                    cached["frame"] = journal.apply_changeset(cached["frame"], changes, exclude=_unloaded(cached))
+                except (TypeError, ValueError) as error:
+                    # One unreadable entry must not lock everybody out of the tracker
+                    LOGGER.warning("Skipped journal entry %s of %s: %s", seq, path, error)
+                    cached["seq"] = seq
+                    continue
+                cached["revs"].update(dict.fromkeys(journal.touched(changes), seq))
+                cached["entries"] += 1
+                if cached["table"] is not None:
+                    cached["replayed"].append(changes)
+            cached["seq"] = seq
+        cached["offset"] = offset
+        cached["version"] = derive_version(signature[2], offset)
+
+        missing = _unloaded(cached) if columns is None else _unloaded(cached).intersection(columns)
+        if missing:
+            _load_columns(cached, missing)
+        frame = cached["frame"]
+        if columns is None or (set(frame.columns) <= set(columns) and not _unloaded(cached)):
+            view, version = frame.copy(deep=False), cached["version"]
+        else:
+            view = frame[[col for col in frame.columns if col in set(columns)]]
+            version = derive_version(cached["version"], tuple(view.columns))
+
+    view.attrs["version"] = version
+    view.attrs["rev"] = cached["seq"]
+    return view
+
+
+def _empty_view(path: str, columns: list = None) -> pd.DataFrame:
+    """The typed empty tracker that stands in for a file that was never saved, at revision 0"""
+    view = empty_tracker()
+    if columns is not None:
+        view = view[[col for col in view.columns if col in set(columns)]]
+    view.attrs["version"] = derive_version(path, tuple(view.columns))
+    view.attrs["rev"] = 0
+    return view
+
+
+def _unloaded(cached: dict) -> set:
+    """Snapshot columns not read into the cached frame yet"""
+    if cached.get("table") is None:
+        return set()
+    return set(snapshot.snapshot_columns(cached["table"])).difference(cached["frame"].columns)
+
+
+def _load_columns(cached: dict, columns: set) -> None:
+    """Reads more snapshot columns into the cached frame, replaying the journal on just those"""
+    extra = snapshot.read_columns(cached["table"], columns)
+    others = set(cached["frame"].columns).union(_unloaded(cached)).difference(columns)
+    for changes in cached["replayed"]:
+        extra = journal.apply_changeset(extra, changes, exclude=others)
+    frame = cached["frame"].assign(**extra.reindex(cached["frame"].index))
+    order = snapshot.snapshot_columns(cached["table"])
+    cached["frame"] = frame[[col for col in order if col in frame.columns] + [col for col in frame.columns if col not in order]]
+
+
+def revisions(path: str = DATA_PATH) -> dict:
+    """
+    Returns the revision of every row saved through the journal
+
+    A row's revision is the sequence number of the last journal entry that wrote or deleted it;
+    rows missing from the result have not changed since the CSV was first written.
+
+    Args:
+        path (str, optional): Path to the tracker CSV. Defaults to ``folder/out.csv``.
+
+    Returns:
+        dict: Row label to revision
+    """
+    with _lock:
+        load_tracker(path, columns=[])
+        return dict(_cache[path]["revs"]) if path in _cache else {}
+
+
+def derive_version(base, *parts) -> str:
+    """
+    Derives a version token for a frame that differs from its loaded version
+
+    Args:
+        base: Version of the frame the changes were made on
+        *parts: Anything describing the changes (edit deltas, row labels, ...)
+
+    Returns:
+        str: Token that changes whenever the base or any of the parts change
+    """
+    digest = hashlib.sha1(repr(base).encode())
+    for part in parts:
+        if isinstance(part, pd.Index):
+            part = pd.util.hash_pandas_object(part).to_numpy().tobytes()
+        digest.update(part if isinstance(part, bytes) else repr(part).encode())
+    return digest.hexdigest()
+
+
+def invalidate(path: str = DATA_PATH) -> None:
+    """
+    Drops the cached frame for a file, forcing the next load to re-parse it
+
+    Args:
+        path (str, optional): Path to the tracker CSV. Defaults to ``folder/out.csv``.
+    """
+    with _lock:
+        _cache.pop(path, None)
+
+
+def save_tracker(df: pd.DataFrame, path: str = DATA_PATH, seq: int = None, revs: dict = None) -> None:
+    """
+    Writes the whole tracker frame to disk, replacing the CSV, its snapshot and its journal
+
+    The row index is written as the leading ``page_id`` column, which the schema turns back
+    into the index on the next load. The file is written next to the CSV and moved into place so
+    readers never see a half-written file. The fresh journal starts with a header carrying the
+    sequence number and row revisions, so revisions keep counting up across rewrites. Writing
+    new contents (no ``seq`` given) also stores them as a base in the tracker's history.
+
+    Args:
+        df (pd.DataFrame): Full tracker frame
+        path (str, optional): Path to the tracker CSV. Defaults to ``folder/out.csv``.
+        seq (int, optional): Sequence number to continue from. Defaults to one past the current
+            one, with every row of ``df`` marked as changed at that revision.
+        revs (dict, optional): Row revisions to carry over. Defaults to every row at ``seq``.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with _lock:
+        replaced = seq is None
+        if replaced:
+            seq = (load_tracker(path, columns=[]).attrs["rev"] if os.path.exists(path) else 0) + 1
+        if revs is None:
+            revs = dict.fromkeys((journal.as_label(label) for label in df.index), seq)
+        df.to_csv(path + '.tmp', index_label=ID_COLUMN)
+        os.replace(path + '.tmp', path)
+        snapshot.write_snapshot(df, path, file_signature(path))
+        journal.truncate(path)
+        journal.append_entry(path, {'seq': seq, 'revs': list(revs.items())})
+        invalidate(path)
+        if replaced:
+            History(history_dir(path)).rebase(seq, df)
+
+
+def save_changes(changes: dict, path: str = DATA_PATH, base: int = None) -> tuple:
+    """
+    Saves a change set by appending it to the journal instead of rewriting the CSV
+
+    Cell values are first converted to the schema (see :func:`journal.coerce_changeset`), so
+    nothing is journaled that would fail later loads. Rows that somebody else saved after
+    revision ``base`` are not written but returned as conflicts; only the rows in the change set are checked. The cached frame picks the entry
+    up without re-parsing the file. Every ``COMPACT_EVERY`` entries the journal is folded
+    back into the CSV. The committed change set is also appended to the tracker's history.
+    The first save of a new tracker creates its CSV.
+
+    Args:
+        changes (dict): Change set from :func:`journal.build_changeset`
+        path (str, optional): Path to the tracker CSV. Defaults to ``folder/out.csv``.
+        base (int, optional): Revision the change set was made against. Defaults to None,
+            which overwrites without checking.
+
+    Returns:
+        tuple: ``(frame, conflicts)``, the tracker frame with the changes applied and the labels
+        of the rows that were left out
+    """
+    changes = journal.coerce_changeset(changes)
+    with _lock:
+        if not os.path.exists(path):
+            save_tracker(empty_tracker(), path, seq=0, revs={})
+        current = load_tracker(path, columns=[])
+        cached = _cache[path]
+        changes, conflicts = journal.resolve_conflicts(
+            changes, cached["revs"], base, current.index, journal.next_label(current),
+        )
+        seq = cached["seq"] + 1
+        history = History(history_dir(path))
+        if not journal.is_empty(changes):
+            if not history.started():
+                history.start(cached["seq"], load_tracker(path))
+            journal.append_entry(path, dict(changes, seq=seq))
+        df = load_tracker(path)
+        if not journal.is_empty(changes):
+            history.record(seq, changes, lambda: df)
+        if _cache[path]["entries"] >= COMPACT_EVERY:
+            compact(path)
+            df = load_tracker(path)
+    return df, conflicts
+
+
+def compact(path: str = DATA_PATH) -> None:
+    """
+    Folds the journal into the CSV and keeps the cached frame, so nothing is re-parsed
+
+    Args:
+        path (str, optional): Path to the tracker CSV. Defaults to ``folder/out.csv``.
+    """
+    with _lock:
+        frame = load_tracker(path)
+        frame.attrs.clear()
+        cached = _cache[path]
+        seq, revs = cached["seq"], dict(cached["revs"])
+        save_tracker(frame, path, seq=seq, revs=revs)
+        signature = file_signature(path)
+        _, offset = journal.read_entries(path)
+        _cache[path] = {
+            "signature": signature,
+            "frame": frame,
+            "offset": offset,
+            "entries": 0,
+            "seq": seq,
+            "revs": revs,
+            "version": derive_version(signature[2], offset),
+            "table": None,
+            "replayed": [],
+        }
@@ -1,28 +1,38 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import os
-from pandas.api.types import (
-    is_categorical_dtype,
-    is_datetime64_any_dtype,
-    is_numeric_dtype,
-    is_object_dtype,
-)
+from export import export_file
+from journal import build_changeset, next_label
+from storage import get_store
 st.set_page_config(page_title="Migration Tracker - ", page_icon="📄", layout="wide")
 st.title('MDWFP Migration Tracker')
 st.markdown('Track the progress of individual page migration status for the MDWFP project') 
 
 
 
+def save():
+    """Saves the editor's edits as a change set; rows somebody else saved meanwhile are left out"""
+    changes = build_changeset(st.session_state.get("editor"), st.session_state["editor_labels"], next_label(store.load(columns=[])))
+    result = store.save(changes, base=st.session_state.get("base_rev"))
+    st.session_state["conflicts"] = result.conflicts
+    del st.session_state["editor"]
+
+
 def convert_df(df):
-   return df.to_csv(index=False).encode('utf-8')
+   # Serialized from cached chunks
+   return export_file(df, 'csv')
 
 
 
 # DATA_URL = ()
 
-df = pd.read_csv('folder/out.csv').astype(str) 
-df['Notes'] = ''
+store = get_store()
+df = store.load()
+edits = st.session_state.get("editor")
+if edits and any(edits.values()):
+    # Edits are kept by row position, so the rows they were made on stay put until saved
+    df = df.reindex(st.session_state["editor_labels"])
+else:
+    st.session_state["editor_labels"] = df.index
+    st.session_state["base_rev"] = df.attrs["rev"]
 users = ['Jim', 'Sarah P', 'Sarah C', 'Braden']
 progress = ['Backlog','In Progress', 'Content Review', 'Client Review', 'Done']
 config = {
@@ -31,7 +41,6 @@ config = {
     'Content Guidance' : st.column_config.Column('Notes', help="Add notes here",
             width="large")
 }
-df = df.astype(str)
 
 
 
@@ -44,17 +53,16 @@ df = df.astype(str)
 st.subheader('Raw data')
 
 # edited_df = st.data_editor(df)
-edited_df=st.data_editor(df, column_config=config, column_order=('State', 'Assignment', 'Content Guidance','URL', 'Title', 'Suggested Title'))
+edited_df=st.data_editor(df, column_config=config, column_order=('State', 'Assignment', 'Content Guidance','URL', 'Title', 'Suggested Title'), key="editor")
 
 
 
-button = st.button("Save")
+st.button("Save", on_click=save)
 
 st.write('Make sure you save your changes')
 
-if button:
-    os.makedirs('folder/', exist_ok=True)
-    edited_df.to_csv('folder/out.csv', index=False) 
+if st.session_state.get("conflicts"):
+    st.warning(f"{len(st.session_state['conflicts'])} row(s) were changed by someone else since you started editing and were not saved.")
 
 inprog = edited_df['State'].value_counts()['In Progress']   
 backlog = edited_df['State'].value_counts()['Backlog']  
@@ -0,0 +1,175 @@
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Per-session limits; the least recently used results are dropped first
+MEMO_ENTRIES = 32
+MEMO_BYTES = 64 * 1024 * 1024
+
+
+def freeze(value):
+    """Turns widget values (lists, tuples, dicts, timestamps) into a hashable cache key part"""
+    if isinstance(value, dict):
+        return tuple(sorted((str(key), freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple, set, pd.Index, np.ndarray)):
+        items = [freeze(item) for item in value]
+        return tuple(sorted(items, key=repr)) if isinstance(value, set) else tuple(items)
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return repr(value)
+
+
+def size_of(value) -> int:
+    """Approximate memory held by a cached result"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=False).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=False))
+    if isinstance(value, np.ndarray) or isinstance(getattr(value, 'nbytes', None), int):
+        # Arrays, and Arrow tables and buffers
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(size_of(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class SessionMemo:
+    """
+    LRU cache for one session's derived results, bounded by entry count and memory
+
+    Keys are built by the caller from everything the result depends on, typically the data
+    version plus the frozen widget values, so a rerun that changed neither is a lookup.
+    """
+
+    def __init__(self, max_entries: int = MEMO_ENTRIES, max_bytes: int = MEMO_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, key, compute):
+        """
+        Returns the cached result for ``key``, computing and storing it on a miss
+
+        Args:
+            key: Hashable description of everything the result depends on
+            compute (callable): Produces the result when it is not cached
+
+        Returns:
+            The cached or freshly computed result
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][0]
+        self.misses += 1
+        value = compute()
+        size = size_of(value)
+        if size <= self.max_bytes:
+            self._entries[key] = (value, size)
+            self.bytes += size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                _, (_, dropped) = self._entries.popitem(last=False)
+                self.bytes -= dropped
+                self.evictions += 1
+        return value
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        """Counters for display: hits, misses, hit rate, evictions, entries and bytes held"""
+        return {
+            'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hit_rate,
+            'evictions': self.evictions, 'entries': len(self), 'bytes': self.bytes,
+        }
+
+
+class SharedMemo:
+    """
+    Process-wide LRU cache of derived results, shared by every session and thread
+
+    Keys are built by the caller, typically from the data version of the frame the result was
+    derived from. Results are computed outside the lock, so two sessions missing the same key
+    at once may both compute it; the later one is kept. Bounded by entry count, by the
+    :func:`size_of` of the results held, or both.
+    """
+
+    def __init__(self, max_entries: int = None, max_bytes: int = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key, compute):
+        """
+        Returns the cached result for ``key``, computing and storing it on a miss
+
+        Args:
+            key: Hashable description of everything the result depends on
+            compute (callable): Produces the result when it is not cached
+
+        Returns:
+            The cached or freshly computed result
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+        value = compute()
+        size = size_of(value) if self.max_bytes is not None else 0
+        with self._lock:
+            if key in self._entries:
+                self.bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.bytes += size
+            while len(self._entries) > 1 and (self.max_entries is not None and len(self._entries) > self.max_entries
+                                               or self.max_bytes is not None and self.bytes > self.max_bytes):
+                _, (_, dropped) = self._entries.popitem(last=False)
+                self.bytes -= dropped
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        """Entries and bytes held"""
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self.bytes}
+
+
+def session_memo(state, name: str = 'memo') -> SessionMemo:
+    """
+    Returns the memo kept in a session's state, creating it on first use
+
+    Args:
+        state: The session's state mapping (``st.session_state``)
+        name (str, optional): Key the memo is kept under. Defaults to ``"memo"``.
+
+    Returns:
+        SessionMemo: The session's memo
+    """
+    if name not in state:
+        state[name] = SessionMemo()
+    return state[name]
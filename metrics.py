@@ -0,0 +1,131 @@
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from memo import SharedMemo
+
+_memo = SharedMemo(32)
+
+
+@dataclass(frozen=True)
+class TrackerMetrics:
+    """Counts and percentages behind the metric expanders; hour estimates are in :mod:`effort`"""
+
+    total: int
+    states: dict = field(default_factory=dict)
+    users: dict = field(default_factory=dict)
+
+    def state(self, name: str) -> int:
+        """Number of rows in a state, 0 when none"""
+        return self.states.get(name, 0)
+
+    def state_percent(self, name: str) -> int:
+        """Share of rows in a state, rounded to a whole percent"""
+        return round(self.state(name) / self.total * 100) if self.total else 0
+
+    def user(self, name: str) -> int:
+        """Number of rows assigned to a migrator, 0 when none"""
+        return self.users.get(name, 0)
+
+
+# Columns every count-based metric is grouped by
+COUNT_KEYS = ['State', 'Users', 'count']
+
+
+def page_counts(df: pd.DataFrame) -> pd.Series:
+    """
+    Rows per combination of State, Users and effort level, missing values included
+
+    Every metric and effort figure is a sum over these counts, so they can be adjusted for a
+    few changed rows (see :mod:`overlay`) instead of being recomputed from the whole frame.
+
+    Args:
+        df (pd.DataFrame): Tracker rows
+
+    Returns:
+        pd.Series: Row count per combination, indexed by the ``COUNT_KEYS`` the frame has
+    """
+    keys = [col for col in COUNT_KEYS if col in df.columns]
+    if not keys or df.empty:
+        return pd.Series(dtype='int64')
+    return df.groupby(keys, observed=True, dropna=False).size()
+
+
+def compute_metrics(df: pd.DataFrame) -> TrackerMetrics:
+    """
+    Computes every tracker metric from a single grouped pass over State, Users and count
+
+    The frame is scanned once; the per-column totals are then summed from the (small) grouped
+    result rather than from the rows.
+
+    Args:
+        df (pd.DataFrame): Tracker rows
+
+    Returns:
+        TrackerMetrics: Counts per state and user
+    """
+    return metrics_from_counts(page_counts(df), len(df))
+
+
+def metrics_from_counts(counts: pd.Series, total: int) -> TrackerMetrics:
+    """
+    Sums the tracker metrics from grouped row counts
+
+    Args:
+        counts (pd.Series): Output of :func:`page_counts`
+        total (int): Number of rows the counts were taken from
+
+    Returns:
+        TrackerMetrics: Counts per state and user
+    """
+    keys = [name for name in counts.index.names if name is not None]
+    if not keys:
+        return TrackerMetrics(total=total)
+
+    def totals(level: str) -> dict:
+        if level not in keys:
+            return {}
+        sums = counts.groupby(level=level, observed=True).sum()
+        return {key: int(value) for key, value in sums.items() if not pd.isna(key)}
+
+    return TrackerMetrics(total=total, states=totals('State'), users=totals('Users'))
+
+
+def cached_page_counts(df: pd.DataFrame, version=None) -> pd.Series:
+    """
+    Returns :func:`page_counts` for a frame, reusing the counts of the same data version
+
+    Args:
+        df (pd.DataFrame): Tracker rows
+        version (optional): Token identifying the frame's contents. Defaults to
+            ``df.attrs["version"]``; frames without a version are always recounted.
+
+    Returns:
+        pd.Series: Row count per combination of State, Users and effort level
+    """
+    if version is None:
+        version = df.attrs.get("version")
+    if version is None:
+        return page_counts(df)
+
+    return _memo.get(('counts', version), lambda: page_counts(df))
+
+
+def cached_metrics(df: pd.DataFrame, version=None) -> TrackerMetrics:
+    """
+    Returns the metrics for a frame, reusing the result computed for the same data version
+
+    Args:
+        df (pd.DataFrame): Tracker rows
+        version (optional): Token identifying the frame's contents. Defaults to
+            ``df.attrs["version"]``; frames without a version are always recomputed.
+
+    Returns:
+        TrackerMetrics: Metrics for the frame
+    """
+    if version is None:
+        version = df.attrs.get("version")
+    if version is None:
+        return compute_metrics(df)
+
+    return _memo.get(('metrics', version), lambda: compute_metrics(df))
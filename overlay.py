@@ -0,0 +1,75 @@
+import pandas as pd
+
+from effort import EffortBreakdown, EffortModel, effort_from_counts
+from journal import apply_changeset, build_changeset, is_empty, next_label, touched
+from loader import derive_version
+from metrics import COUNT_KEYS, TrackerMetrics, cached_page_counts, metrics_from_counts, page_counts
+
+
+class Overlay:
+    """
+    One session's unsaved edits on top of the tracker frame shared by every session
+
+    The base is the store's cached frame; it is never written to, so all sessions of the
+    process read the same columns. The overlay holds only the State, Users and effort level of
+    the rows the session edited, added or deleted, before and after its edits. Metrics and
+    effort of the edited tracker are the base's counts, cached per data version, minus the
+    replaced rows plus the edited ones, so a session with pending edits costs memory in
+    proportion to its edits, not to the tracker.
+    """
+
+    def __init__(self, base: pd.DataFrame, changes: dict):
+        """
+        Args:
+            base (pd.DataFrame): Shared tracker frame the edits were made on
+            changes (dict): The session's pending change set (see :func:`journal.build_changeset`)
+        """
+        self.base = base
+        self.changes = changes
+        labels = pd.Index(touched(changes)).unique()
+        # Rows of the base the edits replace or delete, then the same rows with the edits applied;
+        # only the columns the counts are grouped by are taken
+        columns = [col for col in base.columns if col in COUNT_KEYS]
+        positions = base.index.get_indexer(labels)
+        self.replaced = base[columns].iloc[positions[positions >= 0]]
+        written = {col for _, row in changes.get('upserts', []) for col in row}
+        self.rows = apply_changeset(self.replaced, changes, exclude=written.difference(columns))
+        self.version = derive_version(base.attrs.get("version"), changes) if not is_empty(changes) else base.attrs.get("version")
+
+    @classmethod
+    def from_editor(cls, base: pd.DataFrame, editor_state: dict, labels: pd.Index) -> 'Overlay':
+        """
+        Overlay of the data editor's pending edits
+
+        Args:
+            base (pd.DataFrame): Shared tracker frame
+            editor_state (dict): The editor's session state entry (``edited_rows`` ...)
+            labels (pd.Index): Page ids of the rows that were passed to the editor, in order
+        """
+        return cls(base, build_changeset(editor_state, labels, next_label(base)))
+
+    def __len__(self) -> int:
+        return len(self.base) - len(self.replaced) + len(self.rows)
+
+    def counts(self) -> pd.Series:
+        """Rows per State, Users and effort level of the edited tracker (see :func:`metrics.page_counts`)"""
+        parts = [cached_page_counts(self.base), -page_counts(self.replaced), page_counts(self.rows)]
+        parts = [part for part in parts if len(part)]
+        if len(parts) < 2:
+            return parts[0] if parts else pd.Series(dtype='int64')
+        keys = list(parts[0].index.names)
+        combined = pd.concat([part.rename('rows').reset_index() for part in parts], ignore_index=True)
+        # The edited rows carry every category, in order, so the counts keep the frame's order
+        for key in keys:
+            if isinstance(self.rows[key].dtype, pd.CategoricalDtype):
+                combined[key] = combined[key].astype(self.rows[key].dtype)
+        counts = combined.groupby(keys, observed=True, dropna=False)['rows'].sum()
+        return counts[counts > 0].astype('int64')
+
+    def metrics(self) -> TrackerMetrics:
+        """Tracker metrics with the session's edits"""
+        return metrics_from_counts(self.counts(), len(self))
+
+    def effort(self, model: EffortModel = None) -> EffortBreakdown:
+        """Effort breakdown with the session's edits"""
+        return effort_from_counts(self.counts(), len(self), model)
@@ -0,0 +1,89 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from memo import SharedMemo
+
+# Rows sent to the data editor at a time
+PAGE_SIZES = [50, 100, 250, 500, 1000]
+DEFAULT_PAGE_SIZE = 100
+
+_ranks = SharedMemo(32)
+
+
+def column_ranks(df: pd.DataFrame, column: str) -> np.ndarray:
+    """
+    Sort rank of every row of a frame by one column, missing values last
+
+    Ranks are computed once per data version and column, so re-sorting any filtered view of
+    the same frame is a gather and an integer argsort.
+
+    Args:
+        df (pd.DataFrame): Full tracker frame
+        column (str): Column to sort by
+
+    Returns:
+        np.ndarray: Rank per row position of ``df``
+    """
+    version = df.attrs.get("version")
+    if version is None:
+        return _ranks_of(df[column])
+    return _ranks.get((version, column), lambda: _ranks_of(df[column]))
+
+
+def _ranks_of(series: pd.Series) -> np.ndarray:
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Categories sort in their declared order, like the editor's select boxes
+        values = series.cat.codes.to_numpy().astype(np.int64)
+        values[values < 0] = np.iinfo(np.int64).max
+        order = np.argsort(values, kind='stable')
+    else:
+        order = series.reset_index(drop=True).sort_values(kind='stable', na_position='last').index.to_numpy()
+    ranks = np.empty(len(order), dtype=np.int64)
+    ranks[order] = np.arange(len(order))
+    return ranks
+
+
+def sort_view(df: pd.DataFrame, view: pd.DataFrame, column: str = None, descending: bool = False) -> pd.DataFrame:
+    """
+    Sorts a filtered view of the tracker on the server
+
+    Args:
+        df (pd.DataFrame): Full tracker frame the view was taken from
+        view (pd.DataFrame): Rows to sort
+        column (str, optional): Column to sort by. Defaults to None, which keeps the view's order.
+        descending (bool, optional): Largest first; missing values stay last. Defaults to False.
+
+    Returns:
+        pd.DataFrame: The view in the requested order
+    """
+    if not column or column not in df.columns or len(view) < 2:
+        return view
+    positions = df.index.get_indexer(view.index)
+    ranks = column_ranks(df, column)[positions]
+    if descending:
+        ranks = np.where(df[column].isna().to_numpy()[positions], ranks, -ranks)
+    return view.iloc[np.argsort(ranks, kind='stable')]
+
+
+def page_count(rows: int, size: int) -> int:
+    """Number of pages needed for ``rows`` rows, at least one"""
+    return max(math.ceil(rows / size), 1)
+
+
+def page_slice(view, page: int, size: int):
+    """
+    The rows of one page of a view
+
+    Args:
+        view (pd.DataFrame | np.ndarray): Sorted, filtered rows, or their positions in the full frame
+        page (int): Page number, starting at 1; clamped to the last page
+        size (int): Rows per page
+
+    Returns:
+        pd.DataFrame | np.ndarray: At most ``size`` rows (keeping their global row labels) or positions
+    """
+    page = min(max(page, 1), page_count(len(view), size))
+    rows = view.iloc if isinstance(view, pd.DataFrame) else view
+    return rows[(page - 1) * size:page * size]
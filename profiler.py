@@ -0,0 +1,153 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+import numpy as np
+import pandas as pd
+
+# Finished reruns kept per process for the latency percentiles
+HISTORY_SIZE = 1000
+
+# Set to a file path to also append every finished profile there as one JSON line
+LOG_ENV = 'TRACKER_PROFILE_LOG'
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 5
+
+_active = contextvars.ContextVar('profiler', default=None)
+_lock = threading.Lock()
+_history = deque(maxlen=HISTORY_SIZE)
+_logger = None
+
+
+def describe(df: pd.DataFrame) -> dict:
+    """Row count and (shallow) memory size of a frame, for attaching to a span"""
+    return {'rows': len(df), 'bytes': int(df.memory_usage(index=True, deep=False).sum())}
+
+
+def _log_writer():
+    global _logger
+    path = os.environ.get(LOG_ENV)
+    if not path:
+        return None
+    with _lock:
+        if _logger is None or _logger.path != path:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            logger = logging.getLogger(f'{__name__}.{path}')
+            logger.propagate = False
+            logger.setLevel(logging.INFO)
+            if not logger.handlers:
+                logger.addHandler(RotatingFileHandler(path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding='utf-8'))
+            logger.path = path
+            _logger = logger
+        return _logger
+
+
+class Profiler:
+    """Timing spans for one rerun (or one save) of the app"""
+
+    def __init__(self, kind: str = 'rerun', session: str = None):
+        self.kind = kind
+        self.session = session
+        self.ts = pd.Timestamp.now(tz='UTC').isoformat()
+        self.started = time.perf_counter()
+        self.spans = []
+
+    @contextmanager
+    def span(self, name: str, **meta):
+        """
+        Times the enclosed block
+
+        The yielded dict is stored with the span, so the block can add details such as the
+        row count and memory of the frame it produced (see :func:`describe`).
+        """
+        entry = dict(name=name, **meta)
+        start = time.perf_counter()
+        try:
+            yield entry
+        finally:
+            entry['seconds'] = time.perf_counter() - start
+            self.spans.append(entry)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def finish(self) -> dict:
+        """
+        Closes the profile, adds it to the process history and writes it to the JSONL log
+
+        Returns:
+            dict: ``kind``, ``session``, ``ts``, ``seconds`` and ``spans``
+        """
+        record = {
+            'kind': self.kind, 'session': self.session, 'ts': self.ts,
+            'seconds': self.elapsed, 'spans': self.spans,
+        }
+        with _lock:
+            _history.append((self.kind, record['seconds']))
+        try:
+            writer = _log_writer()
+            if writer is not None:
+                writer.info(json.dumps(record, default=str))
+        except OSError as error:
+            # Profiling must never take the app down
+            logging.getLogger(__name__).warning("Could not write profile to %s: %s", os.environ.get(LOG_ENV), error)
+        return record
+
+
+@contextmanager
+def profile(kind: str = 'rerun', session: str = None):
+    """
+    Makes a new profiler the active one for the enclosed block and finishes it afterwards
+
+    Args:
+        kind (str, optional): What is being profiled. Defaults to ``"rerun"``.
+        session (str, optional): Session id, to tell concurrent users apart in the log
+
+    Yields:
+        Profiler: The active profiler
+    """
+    profiler = Profiler(kind, session)
+    token = _active.set(profiler)
+    try:
+        yield profiler
+    finally:
+        _active.reset(token)
+        profiler.finish()
+
+
+@contextmanager
+def span(name: str, **meta):
+    """Times the enclosed block in the active profiler; a no-op outside of :func:`profile`"""
+    profiler = _active.get()
+    if profiler is None:
+        yield dict(name=name, **meta)
+        return
+    with profiler.span(name, **meta) as entry:
+        yield entry
+
+
+def latency_summary() -> pd.DataFrame:
+    """
+    Latency percentiles of the profiles finished in this process, per kind
+
+    Returns:
+        pd.DataFrame: ``count``, ``p50``, ``p95`` and ``max`` seconds, indexed by kind
+    """
+    with _lock:
+        history = list(_history)
+    if not history:
+        return pd.DataFrame(columns=['count', 'p50', 'p95', 'max'])
+    frame = pd.DataFrame(history, columns=['kind', 'seconds'])
+    return frame.groupby('kind')['seconds'].agg(
+        count='size',
+        p50=lambda seconds: float(np.percentile(seconds, 50)),
+        p95=lambda seconds: float(np.percentile(seconds, 95)),
+        max='max',
+    )
@@ -0,0 +1,125 @@
+import json
+import os
+import threading
+from dataclasses import dataclass, field, fields
+
+# Kept free of pandas: the entry point reads the registry before anybody logs in
+
+REGISTRY_PATH = 'projects.json'
+REGISTRY_ENV = 'TRACKER_PROJECTS'
+
+_lock = threading.Lock()
+_registry = {}
+
+
+@dataclass(frozen=True)
+class Project:
+    """
+    One site migration tracked by the app, with its own data partition and settings
+
+    Empty ``users``, ``states``, ``stages`` and ``effort_hours`` fall back to the app's
+    defaults (:mod:`schema`, :data:`transitions.STAGES`, :data:`effort.EFFORT_HOURS`).
+    """
+
+    key: str
+    title: str
+    subtitle: str = ''
+    data_path: str = ''
+    log_path: str = ''
+    database: str = ''
+    users: tuple = ()
+    states: tuple = ()
+    stages: tuple = ()
+    effort_hours: dict = field(default_factory=dict, hash=False)
+    # Users who may open the project; empty for everyone
+    members: tuple = ()
+
+    def allows(self, user: str) -> bool:
+        """Whether a logged-in user may open the project"""
+        return not self.members or user in self.members
+
+
+DEFAULT_PROJECT = Project(
+    key='mdwfp',
+    title='MDWFP Migration Tracker',
+    subtitle='Track the progress of individual page migration status for the MDWFP project',
+    data_path='folder/out.csv',
+    log_path='folder/transitions.csv',
+    database='cache/cache_db.db',
+)
+
+
+def _project(entry: dict) -> Project:
+    """Builds a project from its registry entry, partitioning its files by key by default"""
+    key = entry['key']
+    known = {item.name for item in fields(Project)}
+    unknown = set(entry) - known
+    if unknown:
+        raise ValueError(f"Unknown settings for project {key!r}: {', '.join(sorted(unknown))}")
+    values = {
+        'title': key.upper(),
+        'data_path': f'folder/{key}/tracker.csv',
+        'log_path': f'folder/{key}/transitions.csv',
+        'database': f'cache/{key}.db',
+        **entry,
+    }
+    for name in ('users', 'states', 'stages', 'members'):
+        values[name] = tuple(values.get(name, ()))
+    values['effort_hours'] = {int(level): float(hours) for level, hours in values.get('effort_hours', {}).items()}
+    return Project(**values)
+
+
+def load_registry(path: str = None) -> dict:
+    """
+    Returns every configured project, re-reading the registry file only when it changed
+
+    The registry is a JSON file ``{"projects": [{"key": ..., "title": ..., ...}]}``. Projects
+    without paths get their own ``folder/<key>/`` data and ``cache/<key>.db`` database.
+    Without a registry file the app tracks the MDWFP project alone.
+
+    Args:
+        path (str, optional): Registry file. Defaults to ``TRACKER_PROJECTS`` or ``projects.json``.
+
+    Returns:
+        dict: Project key to :class:`Project`, in registry order
+    """
+    path = path or os.environ.get(REGISTRY_ENV, REGISTRY_PATH)
+    if not os.path.exists(path):
+        return {DEFAULT_PROJECT.key: DEFAULT_PROJECT}
+    stamp = os.stat(path).st_mtime_ns
+    with _lock:
+        cached = _registry.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+    with open(path, encoding='utf-8') as handle:
+        entries = json.load(handle)['projects']
+    projects = {}
+    for entry in entries:
+        project = _project(entry)
+        if project.key in projects:
+            raise ValueError(f"Project {project.key!r} is registered twice in {path}")
+        projects[project.key] = project
+    if not projects:
+        raise ValueError(f"{path} does not register any project")
+    with _lock:
+        _registry[path] = (stamp, projects)
+    return projects
+
+
+def get_project(key: str = None) -> Project:
+    """
+    Looks a project up in the registry
+
+    Args:
+        key (str, optional): Project key. Defaults to None, the first registered project.
+
+    Returns:
+        Project: The project; the first one when ``key`` is unknown
+    """
+    projects = load_registry()
+    return projects.get(key) or next(iter(projects.values()))
+
+
+def projects_for(user: str) -> list:
+    """Projects a logged-in user may open, in registry order"""
+    return [project for project in load_registry().values() if project.allows(user)]
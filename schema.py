@@ -0,0 +1,164 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+merge = ["Merge ⬆️", "Merge ⬇️"]
+users = ['Jim', 'Sarah P', 'Sarah C', 'Braden', 'Open', 'Alice']
+progress = ['Backlog','In Progress', 'Content Review', 'Client Review', 'Done', 'Mot Prioritized', 'Not migrating', 'Blocked']
+
+CATEGORY_COLUMNS = {'State': progress, 'Users': users, 'Merge': merge}
+TEXT_COLUMNS = ['Notes', 'Legacy URL', 'New URL', 'Title', 'Suggested Title', 'Jira Epic']
+CYCLE_COLUMNS = ['IP', 'Content Review', 'Client Review', 'Done']
+EFFORT_COLUMN = 'count'
+# Effort levels a page can have; anything else is read as missing
+EFFORT_RANGE = (0, 100)
+# Columns of a tracker, in file order
+TRACKER_COLUMNS = ['count', 'State', 'Users', 'Notes', 'Merge', 'Legacy URL', 'New URL', 'Title', 'Suggested Title', 'Jira Epic']
+
+# Column holding each row's durable page id; files written before it had a name keep the id
+# in their leading unnamed column
+ID_COLUMN = 'page_id'
+# Leftovers of frames written with their index, e.g. "Unnamed: 0" or "Unnamed: 0.3"
+INDEX_ARTIFACT = re.compile(r"^Unnamed: \d+(\.\d+)?$")
+
+
+def _categorical(series: pd.Series, categories: list) -> pd.Series:
+    """
+    Converts a column to a categorical over the declared options
+
+    Labels are stripped and blank cells become NaN. Values outside the declared options are
+    kept as extra categories rather than silently turned into NaN. Only the distinct labels
+    are inspected; the rows themselves are remapped through their category codes.
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype("category")
+    labels = [str(label).strip() for label in series.cat.categories]
+    extra = sorted({label for label in labels if label} - set(categories))
+    target = pd.CategoricalDtype(list(categories) + extra)
+    position = {label: code for code, label in enumerate(target.categories)}
+    # The trailing -1 is picked up by missing values, whose code is -1 as well.
+    lookup = np.array([position.get(label, -1) for label in labels] + [-1], dtype=np.int16)
+    codes = lookup[series.cat.codes.to_numpy()]
+    return pd.Series(pd.Categorical.from_codes(codes, dtype=target), index=series.index, name=series.name)
+
+
+def page_ids(labels) -> pd.Index:
+    """
+    Turns row labels read from a file into durable page ids: unique integers
+
+    Ids are kept as they are. Labels that are missing, not whole numbers or repeated (e.g. a
+    stale positional index) get fresh ids after the largest valid one; the first row with a
+    repeated id keeps it.
+
+    Args:
+        labels: Row labels as read
+
+    Returns:
+        pd.Index: Unnamed int64 index of page ids
+    """
+    ids = pd.to_numeric(pd.Series(labels, dtype=object), errors="coerce").astype("float64")
+    invalid = (ids.isna() | (ids % 1 != 0) | ids.duplicated()).to_numpy()
+    if invalid.any():
+        start = int(ids[~invalid].max()) + 1 if (~invalid).any() else 0
+        ids[invalid] = np.arange(start, start + invalid.sum())
+    return pd.Index(ids.to_numpy(dtype="int64"))
+
+
+def effort_levels(values) -> pd.Series:
+    """
+    Converts effort levels to nullable small integers
+
+    Fractional levels are rounded to the nearest whole level; values that are not numbers or
+    fall outside ``EFFORT_RANGE`` become missing instead of failing the cast.
+
+    Args:
+        values (pd.Series): Effort levels as read or edited
+
+    Returns:
+        pd.Series: ``Int8`` levels
+    """
+    levels = pd.to_numeric(values, errors="coerce").astype("Float64").round()
+    levels = levels.where(levels.between(*EFFORT_RANGE))
+    return levels.astype("Int8")
+
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Casts the tracker columns to their declared dtypes
+
+    The ``page_id`` column, or else the first index artifact column, becomes the row index (see
+    :func:`page_ids`); remaining artifacts are dropped. State/Users/Merge become categoricals, ``count`` a nullable small integer (see
+    :func:`effort_levels`), the free-text
+    and URL columns nullable strings and the cycle columns datetimes. Columns that are not
+    present are left out rather than created.
+
+    Args:
+        df (pd.DataFrame): Tracker rows as read from disk or returned by the data editor
+
+    Returns:
+        pd.DataFrame: Frame with the declared dtypes
+    """
+    artifacts = [col for col in df.columns if INDEX_ARTIFACT.match(str(col))]
+    key = ID_COLUMN if ID_COLUMN in df.columns else next(iter(artifacts), None)
+    if key is not None:
+        df = df.set_index(key).drop(columns=[col for col in artifacts if col != key])
+        df.index = page_ids(df.index)
+
+    columns = {}
+    for col, categories in CATEGORY_COLUMNS.items():
+        if col in df.columns:
+            columns[col] = _categorical(df[col], categories)
+    if EFFORT_COLUMN in df.columns:
+        columns[EFFORT_COLUMN] = effort_levels(df[EFFORT_COLUMN])
+    for col in TEXT_COLUMNS:
+        if col in df.columns:
+            columns[col] = df[col].astype("string")
+    for col in CYCLE_COLUMNS:
+        if col in df.columns:
+            columns[col] = pd.to_datetime(df[col], errors="coerce")
+
+    return df.assign(**columns)
+
+
+def with_categories(df: pd.DataFrame, categories: dict) -> pd.DataFrame:
+    """
+    Adds options to the categorical columns of a frame, e.g. a project's own users and states
+
+    The editor can only write values that are categories of the column, so every option it
+    offers must be one. Existing categories and codes are left as they are.
+
+    Args:
+        df (pd.DataFrame): Typed tracker frame
+        categories (dict): Column to the options it must accept
+
+    Returns:
+        pd.DataFrame: The frame, with the missing options appended to its categories
+    """
+    columns = {}
+    for col, options in categories.items():
+        if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype):
+            missing = [option for option in dict.fromkeys(options) if option not in set(df[col].cat.categories)]
+            if missing:
+                columns[col] = df[col].cat.add_categories(missing)
+    return df.assign(**columns) if columns else df
+
+
+def read_tracker_csv(path: str) -> pd.DataFrame:
+    """
+    Parses a tracker CSV straight into the declared schema
+
+    Args:
+        path (str): Path to the tracker CSV
+
+    Returns:
+        pd.DataFrame: Typed tracker frame
+    """
+    dtype = {col: "string" for col in TEXT_COLUMNS}
+    dtype.update({col: "category" for col in CATEGORY_COLUMNS})
+    return apply_schema(pd.read_csv(path, dtype=dtype))
+
+
+def empty_tracker() -> pd.DataFrame:
+    """A typed tracker frame without rows, to start a new project from"""
+    return apply_schema(pd.DataFrame({col: pd.Series(dtype=object) for col in TRACKER_COLUMNS}))
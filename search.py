@@ -0,0 +1,303 @@
+import math
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Searched columns and how much a hit in each counts towards the rank
+SEARCH_COLUMNS = {'Title': 3.0, 'Suggested Title': 2.0, 'Legacy URL': 2.0, 'New URL': 2.0, 'Notes': 1.0}
+URL_COLUMNS = ('Legacy URL', 'New URL')
+
+# Most vocabulary terms the last, still-being-typed query word expands to
+PREFIX_EXPANSION = 50
+
+# Re-indexed rows live in a small overlay; past this share of the base it is merged back
+OVERLAY_LIMIT = 0.2
+
+_SEPARATOR = r"[^\p{L}\p{N}_]+"
+_SEGMENT = r"^[^\s]*[^\p{L}\p{N}_\s][^\s]*$"
+_SCHEME_AND_HOST = r"^[a-z][a-z0-9+.-]*://[^/]*"
+
+_lock = threading.Lock()
+_indexes = {}
+
+
+def term_table(texts: pd.Series, url: bool = False) -> tuple:
+    """
+    Splits a column into lower-case search terms with pyarrow's vectorized string kernels
+
+    Args:
+        texts (pd.Series): Cells to split
+        url (bool, optional): Treat the cells as URLs: only the path is used (scheme and host are
+            the same for nearly every page), and whole path segments such as ``law-enforcement``
+            are emitted as well. Defaults to False.
+
+    Returns:
+        tuple: ``(rows, terms)``, the position of the cell and the term for every occurrence
+    """
+    array = pa.array(texts.astype('string'), type=pa.large_string())
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+    array = pc.utf8_lower(array)
+    pieces = []
+    if url:
+        array = pc.replace_substring_regex(array, _SCHEME_AND_HOST, '')
+        array = pc.replace_substring_regex(array, r"[?#].*$", '')
+        segments = pc.split_pattern(array, '/')
+        # Only segments that hold punctuation add anything beyond their words
+        pieces.append((segments, lambda flat: pc.match_substring_regex(flat, _SEGMENT)))
+    pieces.append((pc.split_pattern_regex(array, _SEPARATOR), lambda flat: pc.greater(pc.utf8_length(flat), 0)))
+
+    rows, terms = [], []
+    for lists, keep in pieces:
+        flat = pc.list_flatten(lists)
+        mask = pc.fill_null(keep(flat), False)
+        rows.append(pc.filter(pc.list_parent_indices(lists), mask).to_numpy().astype(np.int64))
+        terms.append(pc.filter(flat, mask))
+    return np.concatenate(rows), pa.concat_arrays(terms)
+
+
+def weighted_terms(df: pd.DataFrame) -> tuple:
+    """
+    Postings of every searched column of a frame, summed per term and row
+
+    Args:
+        df (pd.DataFrame): Tracker rows
+
+    Returns:
+        tuple: ``(vocabulary, starts, rows, weights)``; ``vocabulary`` is sorted, and the
+        postings of ``vocabulary[i]`` are ``rows[starts[i]:starts[i + 1]]`` (row positions in
+        ``df``) with the matching ``weights``
+    """
+    rows, terms, weights = [], [], []
+    for column, weight in SEARCH_COLUMNS.items():
+        if column in df.columns:
+            found_rows, found_terms = term_table(df[column], url=column in URL_COLUMNS)
+            rows.append(found_rows)
+            terms.append(found_terms)
+            weights.append(np.full(len(found_rows), weight))
+    if not rows or not sum(len(found) for found in rows):
+        return np.array([], dtype=object), np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+
+    encoded = pc.dictionary_encode(pa.concat_arrays(terms))
+    vocabulary = np.asarray(encoded.dictionary.to_pylist(), dtype=object)
+    alphabetical = np.argsort(vocabulary)
+    rank = np.empty(len(alphabetical), dtype=np.int64)
+    rank[alphabetical] = np.arange(len(alphabetical))
+    # One sortable int64 per (term, row) occurrence; equal keys are summed
+    size = max(len(df), 1)
+    keys = rank[encoded.indices.to_numpy()] * size + np.concatenate(rows)
+    order = np.argsort(keys, kind='stable')
+    keys, weights = keys[order], np.concatenate(weights)[order]
+    firsts = np.flatnonzero(np.diff(keys, prepend=-1))
+    weights = np.add.reduceat(weights, firsts)
+    codes, rows = np.divmod(keys[firsts], size)
+    starts = np.searchsorted(codes, np.arange(len(vocabulary) + 1))
+    return vocabulary[alphabetical], starts, rows, weights
+
+
+def query_terms(query: str) -> list:
+    """Search terms of a query, split exactly like the indexed cells"""
+    _, found = term_table(pd.Series([query]), url=True)
+    return list(dict.fromkeys(found.to_pylist()))
+
+
+class SearchIndex:
+    """
+    Inverted index from search terms to tracker rows
+
+    The bulk of the postings is a compressed, term-sorted base built with vectorized kernels.
+    Rows re-indexed after that go to a small overlay and their base postings are masked out,
+    so an edit costs only the edited rows; the overlay is merged back once it grows past
+    ``OVERLAY_LIMIT`` of the base.
+    """
+
+    def __init__(self):
+        self.rev = None
+        self._clear()
+
+    def _clear(self) -> None:
+        self._labels = []
+        self._doc_of = {}
+        self._stale = np.zeros(0, dtype=bool)
+        self._terms = np.array([], dtype=object)
+        self._slots = {}
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._docs = np.zeros(0, dtype=np.int64)
+        self._weights = np.zeros(0)
+        self._overlay = {}
+        self._overlay_terms = None
+        self._base_rows = 0
+        self._overlay_rows = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_of)
+
+    def _new_docs(self, labels) -> np.ndarray:
+        for label in labels:
+            old = self._doc_of.get(label)
+            if old is not None:
+                self._stale[old] = True
+        start = len(self._labels)
+        self._labels.extend(labels)
+        self._doc_of.update(zip(labels, range(start, len(self._labels))))
+        self._stale = np.concatenate([self._stale, np.zeros(len(labels), dtype=bool)])
+        return np.arange(start, len(self._labels))
+
+    def build(self, df: pd.DataFrame) -> None:
+        """Indexes every row of the frame from scratch"""
+        self._clear()
+        self._new_docs(list(df.index))
+        self._terms, self._offsets, self._docs, self._weights = weighted_terms(df)
+        self._slots = {term: slot for slot, term in enumerate(self._terms)}
+        self._base_rows = len(df)
+
+    def update(self, df: pd.DataFrame, labels) -> None:
+        """Re-indexes the given rows; labels no longer in the frame are dropped"""
+        labels = list(dict.fromkeys(labels))
+        present = df.index.intersection(pd.Index(labels))
+        for label in set(labels).difference(present):
+            doc = self._doc_of.pop(label, None)
+            if doc is not None:
+                self._stale[doc] = True
+        if not len(present):
+            return
+        if self._overlay_rows + len(present) > OVERLAY_LIMIT * max(self._base_rows, 1):
+            self.build(df)
+            return
+        docs = self._new_docs(list(present))
+        terms, starts, rows, weights = weighted_terms(df.loc[present])
+        for slot, term in enumerate(terms):
+            postings = self._overlay.setdefault(term, {})
+            span = slice(starts[slot], starts[slot + 1])
+            postings.update(zip(docs[rows[span]].tolist(), weights[span].tolist()))
+        self._overlay_rows += len(present)
+        self._overlay_terms = None
+
+    def sync(self, df: pd.DataFrame, store) -> None:
+        """
+        Brings the index up to the store revision of ``df``
+
+        Only the rows the store reports as changed since the indexed revision are re-indexed;
+        the index is rebuilt when it has no revision to start from.
+
+        Args:
+            df (pd.DataFrame): Frame as loaded from the store
+            store (storage.TrackerStore): Store the frame came from
+        """
+        rev = df.attrs.get("rev")
+        if self.rev is None or rev is None or rev < self.rev:
+            self.build(df)
+        elif rev > self.rev:
+            self.update(df, store.changed_since(self.rev))
+        self.rev = rev
+
+    def _postings(self, term: str) -> tuple:
+        """Live documents and weights for a term, base and overlay combined"""
+        docs, weights = [], []
+        slot = self._slots.get(term)
+        if slot is not None:
+            start, stop = self._offsets[slot], self._offsets[slot + 1]
+            docs.append(self._docs[start:stop])
+            weights.append(self._weights[start:stop])
+        extra = self._overlay.get(term)
+        if extra:
+            docs.append(np.fromiter(extra.keys(), dtype=np.int64, count=len(extra)))
+            weights.append(np.fromiter(extra.values(), dtype=float, count=len(extra)))
+        if not docs:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        docs, weights = np.concatenate(docs), np.concatenate(weights)
+        live = ~self._stale[docs]
+        return docs[live], weights[live]
+
+    def _expand(self, term: str) -> list:
+        """Vocabulary terms starting with ``term``"""
+        start = np.searchsorted(self._terms, term, side='left') if len(self._terms) else 0
+        found = list(self._terms[start:start + PREFIX_EXPANSION])
+        found = [candidate for candidate in found if candidate.startswith(term)]
+        if self._overlay_terms is None:
+            self._overlay_terms = sorted(self._overlay)
+        found += [candidate for candidate in self._overlay_terms if candidate.startswith(term)]
+        return list(dict.fromkeys(found))[:PREFIX_EXPANSION]
+
+    def search(self, query: str, limit: int = None) -> list:
+        """
+        Ranks the rows matching a query
+
+        Every query term is looked up exactly; the last one also matches as a prefix (up to
+        ``PREFIX_EXPANSION`` terms), so results show up while typing. A row scores the
+        field-weighted hits of each term times the term's inverse document frequency.
+
+        Args:
+            query (str): Words and/or URL paths to look for
+            limit (int, optional): Maximum number of results. Defaults to all of them.
+
+        Returns:
+            list: ``(label, score)`` pairs, best match first
+        """
+        words = query_terms(query)
+        if not words:
+            return []
+        terms = words[:-1] + [term for term in self._expand(words[-1]) or [words[-1]] if term not in words[:-1]]
+        scores = np.zeros(len(self._labels))
+        total = max(len(self), 1)
+        for term in terms:
+            docs, weights = self._postings(term)
+            if len(docs):
+                idf = math.log(1 + total / len(docs))
+                scores += np.bincount(docs, weights * idf, minlength=len(scores))
+        hits = np.flatnonzero(scores)
+        hits = hits[np.argsort(-scores[hits], kind='stable')][:limit]
+        return [(self._labels[doc], float(scores[doc])) for doc in hits]
+
+
+def get_index(store) -> SearchIndex:
+    """
+    Returns the process-wide search index for a store
+
+    Args:
+        store (storage.TrackerStore): Store whose rows are indexed
+
+    Returns:
+        SearchIndex: Index shared by every session of this process
+    """
+    with _lock:
+        return _indexes.setdefault(id(store), SearchIndex())
+
+
+def sync_index(df: pd.DataFrame, store) -> SearchIndex:
+    """
+    Brings the shared index for a store up to ``df`` without searching, e.g. to build it ahead of time
+
+    Args:
+        df (pd.DataFrame): Frame as loaded from the store
+        store (storage.TrackerStore): Store the frame came from
+
+    Returns:
+        SearchIndex: The synced index
+    """
+    index = get_index(store)
+    with _lock:
+        index.sync(df, store)
+    return index
+
+
+def search(df: pd.DataFrame, store, query: str, limit: int = None) -> list:
+    """
+    Ranks the tracker rows matching a query, syncing the shared index to ``df`` first
+
+    Args:
+        df (pd.DataFrame): Frame as loaded from the store
+        store (storage.TrackerStore): Store the frame came from
+        query (str): Words and/or URL paths to look for
+        limit (int, optional): Maximum number of results. Defaults to all of them.
+
+    Returns:
+        list: ``(label, score)`` pairs, best match first
+    """
+    index = get_index(store)
+    with _lock:
+        index.sync(df, store)
+        return index.search(query, limit)
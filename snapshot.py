@@ -0,0 +1,120 @@
+import json
+import logging
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from schema import apply_schema
+
+# Written next to the tracker CSV, e.g. folder/out.feather
+SNAPSHOT_SUFFIX = '.feather'
+# Schema metadata key holding the signature (mtime, size, hash) of the CSV it was written from
+SOURCE_KEY = b'tracker_source'
+
+LOGGER = logging.getLogger(__name__)
+
+
+def snapshot_path(path: str) -> str:
+    """Columnar snapshot file belonging to a tracker CSV"""
+    return os.path.splitext(path)[0] + SNAPSHOT_SUFFIX
+
+
+def write_snapshot(df: pd.DataFrame, path: str, source: tuple) -> None:
+    """
+    Writes the tracker frame as an uncompressed Arrow (Feather v2) file next to its CSV
+
+    Uncompressed files can be memory-mapped, so reading a column later touches only that
+    column's bytes. The snapshot is a cache: failing to write it is logged, not raised.
+
+    Args:
+        df (pd.DataFrame): Full, typed tracker frame, as parsed from the CSV
+        path (str): Path to the tracker CSV
+        source (tuple): Signature of that CSV (see :func:`loader.file_signature`)
+    """
+    target = snapshot_path(path)
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=True)
+        table = table.replace_schema_metadata({**table.schema.metadata, SOURCE_KEY: json.dumps(list(source))})
+        feather.write_feather(table, target + '.tmp', compression='uncompressed')
+        os.replace(target + '.tmp', target)
+    except (OSError, pa.ArrowException) as error:
+        LOGGER.warning("Could not write the tracker snapshot %s: %s", target, error)
+
+
+def _source(schema: pa.Schema):
+    recorded = (schema.metadata or {}).get(SOURCE_KEY)
+    return tuple(json.loads(recorded)) if recorded else None
+
+
+def recorded_signature(path: str):
+    """
+    Signature of the CSV the snapshot was written from, read from the snapshot's metadata only
+
+    Args:
+        path (str): Path to the tracker CSV
+
+    Returns:
+        tuple | None: ``(mtime_ns, size, sha1)``; None without a readable snapshot
+    """
+    target = snapshot_path(path)
+    if not os.path.exists(target):
+        return None
+    try:
+        return _source(pa.ipc.open_file(pa.memory_map(target)).schema)
+    except (OSError, pa.ArrowException, ValueError):
+        return None
+
+
+def open_snapshot(path: str, source: tuple):
+    """
+    Memory-maps the snapshot of a tracker CSV, if one was written from exactly this CSV
+
+    Args:
+        path (str): Path to the tracker CSV
+        source (tuple): Signature of the CSV as it is now; only the content hash is compared
+
+    Returns:
+        pa.Table | None: The mapped table; None when there is no snapshot or it is stale
+    """
+    target = snapshot_path(path)
+    if not os.path.exists(target):
+        return None
+    try:
+        # The table's buffers point into the mapping, which stays open as long as they are used
+        table = pa.ipc.open_file(pa.memory_map(target)).read_all()
+    except (OSError, pa.ArrowException) as error:
+        LOGGER.warning("Ignoring unreadable tracker snapshot %s: %s", target, error)
+        return None
+    recorded = _source(table.schema)
+    if recorded is None or recorded[2] != source[2]:
+        return None
+    return table
+
+
+def snapshot_columns(table: pa.Table) -> list:
+    """Tracker columns stored in a snapshot, in file order, without the row index"""
+    index = set(table.schema.pandas_metadata['index_columns'])
+    return [name for name in table.column_names if name not in index]
+
+
+def read_columns(table: pa.Table, columns: list = None) -> pd.DataFrame:
+    """
+    Converts some columns of a snapshot into a typed frame indexed by row label
+
+    Only the selected columns are materialised; text columns stay backed by Arrow memory. The
+    dtypes are set by the schema again rather than taken from the Arrow dictionaries, which only
+    hold the categories present in the data (none at all for a snapshot of an empty tracker).
+
+    Args:
+        table (pa.Table): Snapshot from :func:`open_snapshot`
+        columns (list, optional): Columns to read. Defaults to None, every column.
+
+    Returns:
+        pd.DataFrame: The columns with their declared dtypes (see :func:`schema.apply_schema`)
+    """
+    index = table.schema.pandas_metadata['index_columns']
+    stored = snapshot_columns(table)
+    wanted = stored if columns is None else [col for col in stored if col in set(columns)]
+    return apply_schema(table.select(wanted + index).to_pandas())
@@ -0,0 +1,104 @@
+import importlib
+import logging
+import os
+import sys
+import threading
+import time
+
+# Imported first by the entry point, so marks count from the app's first script run
+_started = time.perf_counter()
+_lock = threading.Lock()
+_marks = {}
+_threads = {}
+
+LOGGER = logging.getLogger(__name__)
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+_on_path = False
+
+
+def mark(name: str) -> None:
+    """Records the first time the app reached a startup milestone in this process"""
+    with _lock:
+        _marks.setdefault(name, time.perf_counter() - _started)
+
+
+def timeline() -> list:
+    """
+    The startup milestones reached so far
+
+    Returns:
+        list: ``(name, seconds)`` pairs in the order they were reached, seconds counted from
+        the entry point's first import
+    """
+    with _lock:
+        return sorted(_marks.items(), key=lambda item: item[1])
+
+
+def in_background(name: str, func) -> threading.Thread:
+    """
+    Runs ``func`` on a daemon thread unless a thread of the same name is still running
+
+    Failures are logged; the foreground simply does the work itself when it gets there.
+
+    Args:
+        name (str): Name of the task, also marked in the timeline when it finishes
+        func (callable): Work to do, without arguments
+
+    Returns:
+        threading.Thread: The running thread
+    """
+    def work():
+        try:
+            func()
+            mark(f'{name} done')
+        except Exception:
+            LOGGER.exception("Background task %s failed", name)
+
+    with _lock:
+        thread = _threads.get(name)
+        if thread is None or not thread.is_alive():
+            thread = _threads[name] = threading.Thread(target=work, name=name, daemon=True)
+            thread.start()
+    return thread
+
+
+def wait(name: str, timeout: float = None) -> bool:
+    """
+    Waits for a background task to finish, so the caller reuses its results instead of redoing them
+
+    Args:
+        name (str): Name the task was started under
+        timeout (float, optional): Seconds to wait at most. Defaults to no limit.
+
+    Returns:
+        bool: True when the task is not running (any more)
+    """
+    with _lock:
+        thread = _threads.get(name)
+    if thread is not None and thread is not threading.current_thread():
+        thread.join(timeout)
+    return thread is None or not thread.is_alive()
+
+
+def prewarm(module: str = 'tracker_page') -> threading.Thread:
+    """
+    Imports the tracker page and prepares its data in the background
+
+    Started while the login form is on screen; what it builds lands in the process-wide
+    caches, which every session's first render then finds ready.
+
+    Args:
+        module (str, optional): Module with a ``prewarm()`` function. Defaults to ``"tracker_page"``.
+
+    Returns:
+        threading.Thread: The prewarm thread
+    """
+    global _on_path
+    with _lock:
+        if not _on_path:
+            # Streamlit may put the app's directory on sys.path only while a script runs, which
+            # can end before the thread gets to its imports; keep an entry of our own
+            sys.path.append(_APP_DIR)
+            _on_path = True
+    return in_background('prewarm', lambda: importlib.import_module(module).prewarm())
@@ -0,0 +1,365 @@
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from dataclasses import dataclass, field
+from itertools import groupby
+
+import pandas as pd
+
+import journal
+import loader
+from history import History, history_dir
+from memo import SharedMemo
+from metrics import COUNT_KEYS, cached_page_counts
+from projects import Project, get_project
+from schema import apply_schema, empty_tracker, read_tracker_csv
+
+DB_PATH = 'cache/cache_db.db'
+
+_stores = {}
+_stores_lock = threading.Lock()
+_counts = SharedMemo(32)
+
+
+@dataclass
+class SaveResult:
+    """Outcome of saving a change set"""
+
+    frame: pd.DataFrame
+    conflicts: list = field(default_factory=list)
+
+
+class TrackerStore:
+    """
+    Where the tracker rows live. Backends load the full frame and save change sets.
+
+    Loaded frames carry ``attrs["version"]``, a token for their contents, and ``attrs["rev"]``,
+    the store revision they reflect. Every row also has a revision: the store revision that
+    last wrote or deleted it.
+    """
+
+    def load(self, columns: list = None) -> pd.DataFrame:
+        """
+        Returns a copy-on-write view of the current tracker frame
+
+        When ``columns`` is given only those columns are returned (an empty list gives just the
+        rows), and backends may avoid reading the others at all.
+        """
+        raise NotImplementedError
+
+    def save(self, changes: dict, base: int = None) -> SaveResult:
+        """
+        Persists a change set from :func:`journal.build_changeset`
+
+        When ``base`` is given, rows whose revision is newer than it were changed by someone
+        else in the meantime; they are left out and reported as conflicts.
+        """
+        raise NotImplementedError
+
+    def replace(self, df: pd.DataFrame) -> None:
+        """Replaces every stored row with the rows of ``df``"""
+        raise NotImplementedError
+
+    def changed_since(self, rev: int) -> list:
+        """Labels of the rows written or deleted after store revision ``rev``"""
+        raise NotImplementedError
+
+    def history(self) -> History:
+        """Past versions of the tracker, one per save (see :class:`history.History`)"""
+        raise NotImplementedError
+
+    def page_counts(self) -> pd.Series:
+        """
+        Rows per State, Users and effort level (see :func:`metrics.page_counts`), once per revision
+
+        Only the counted columns are loaded; backends may count without loading rows at all.
+        """
+        return cached_page_counts(self.load(columns=COUNT_KEYS))
+
+
+class CsvStore(TrackerStore):
+    """The tracker CSV plus its change journal, as handled by :mod:`loader`"""
+
+    def __init__(self, path: str = loader.DATA_PATH):
+        self.path = path
+
+    def load(self, columns: list = None) -> pd.DataFrame:
+        return loader.load_tracker(self.path, columns)
+
+    def save(self, changes: dict, base: int = None) -> SaveResult:
+        frame, conflicts = loader.save_changes(changes, self.path, base)
+        return SaveResult(frame, conflicts)
+
+    def replace(self, df: pd.DataFrame) -> None:
+        loader.save_tracker(df, self.path)
+
+    def changed_since(self, rev: int) -> list:
+        return [label for label, saved in loader.revisions(self.path).items() if saved > rev]
+
+    def history(self) -> History:
+        return History(history_dir(self.path))
+
+
+def _quote(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _sql_value(value):
+    """Converts a cell to something sqlite3 can bind"""
+    if value is None or (not isinstance(value, (list, dict)) and pd.isna(value)):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+
+class SqliteStore(TrackerStore):
+    """
+    Tracker rows in an embedded SQLite database (WAL mode)
+
+    Each save is one transaction that upserts only the changed rows and bumps a version
+    counter. Every row remembers the version that last wrote it, and deletions are kept as
+    tombstones, so a process whose cached frame is behind only reads the rows saved since.
+    The database is created and seeded from the tracker CSV the first time it is opened; while
+    neither exists the store reads as an empty tracker, and the first save creates the database.
+    """
+
+    def __init__(self, path: str = DB_PATH, seed_csv: str = loader.DATA_PATH):
+        self.path = path
+        self.seed_csv = seed_csv
+        self._lock = threading.RLock()
+        self._frame = None
+        self._version = None
+        self._created = False
+
+    def _exists(self) -> bool:
+        """Whether there are rows to read: the database, or the CSV it would be seeded from"""
+        return self._created or os.path.exists(self.path) or bool(self.seed_csv and os.path.exists(self.seed_csv))
+
+    def _connect(self) -> sqlite3.Connection:
+        """Opens the database, creating and seeding it on first use"""
+        if not self._created:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._create()
+            self._created = True
+        return self._open()
+
+    def _open(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        con.execute('PRAGMA journal_mode=WAL')
+        con.execute('PRAGMA synchronous=NORMAL')
+        return con
+
+    def _create(self) -> None:
+        with closing(self._open()) as con:
+            con.execute('BEGIN IMMEDIATE')
+            exists = con.execute("SELECT 1 FROM sqlite_master WHERE name = 'tracker'").fetchone()
+            if not exists:
+                con.execute('CREATE TABLE tracker (row_id INTEGER PRIMARY KEY, _saved INTEGER NOT NULL DEFAULT 0)')
+                con.execute('CREATE TABLE deleted (row_id INTEGER PRIMARY KEY, version INTEGER NOT NULL)')
+                con.execute('CREATE TABLE meta (version INTEGER NOT NULL)')
+                con.execute('INSERT INTO meta VALUES (0)')
+                if self.seed_csv and os.path.exists(self.seed_csv):
+                    self._insert(con, read_tracker_csv(self.seed_csv), 0)
+                self._index(con)
+            con.execute('COMMIT')
+
+    @staticmethod
+    def _index(con: sqlite3.Connection) -> None:
+        columns = {row[1] for row in con.execute('PRAGMA table_info(tracker)')}
+        for column in ('State', 'Users'):
+            if column in columns:
+                con.execute(f'CREATE INDEX IF NOT EXISTS {_quote("idx_" + column)} ON tracker ({_quote(column)})')
+        con.execute('CREATE INDEX IF NOT EXISTS idx_saved ON tracker (_saved)')
+
+    @staticmethod
+    def _add_columns(con: sqlite3.Connection, columns) -> None:
+        existing = {row[1] for row in con.execute('PRAGMA table_info(tracker)')}
+        for column in columns:
+            if column not in existing:
+                con.execute(f'ALTER TABLE tracker ADD COLUMN {_quote(column)}')
+
+    def _insert(self, con: sqlite3.Connection, df: pd.DataFrame, version: int) -> None:
+        self._add_columns(con, df.columns)
+        names = ', '.join(_quote(col) for col in df.columns)
+        marks = ', '.join('?' for _ in df.columns)
+        rows = (
+            (_sql_value(label), version, *(_sql_value(value) for value in values))
+            for label, values in zip(df.index, df.itertuples(index=False, name=None))
+        )
+        con.executemany(f'INSERT INTO tracker (row_id, _saved, {names}) VALUES (?, ?, {marks})', rows)
+
+    def _read(self, con: sqlite3.Connection, where: str = '', params: tuple = ()) -> pd.DataFrame:
+        df = pd.read_sql_query(f'SELECT * FROM tracker {where}', con, params=params)
+        df = df.set_index('row_id').drop(columns='_saved')
+        df.index.name = None
+        return df
+
+    def load(self, columns: list = None) -> pd.DataFrame:
+        with self._lock:
+            if not self._exists():
+                view, version = empty_tracker(), 0
+            else:
+                with closing(self._connect()) as con:
+                    con.execute('BEGIN')
+                    version = con.execute('SELECT version FROM meta').fetchone()[0]
+                    if self._frame is None:
+                        self._frame = apply_schema(self._read(con))
+                    elif version != self._version:
+                        rows = self._read(con, 'WHERE _saved > ?', (self._version,))
+                        deleted = [row[0] for row in con.execute('SELECT row_id FROM deleted WHERE version > ?', (self._version,))]
+                        self._frame = journal.apply_rows(self._frame, rows, deleted)
+                    con.execute('COMMIT')
+                self._version = version
+                view = self._frame.copy(deep=False)
+        view.attrs["version"] = loader.derive_version(self.path, version)
+        if columns is not None and not set(view.columns) <= set(columns):
+            view = view[[col for col in view.columns if col in set(columns)]]
+            view.attrs["version"] = loader.derive_version(view.attrs["version"], tuple(view.columns))
+        view.attrs["rev"] = version
+        return view
+
+    @staticmethod
+    def _revisions(con: sqlite3.Connection, labels: list) -> tuple:
+        """Current revision of the given rows (tombstones included) and which of them exist"""
+        revisions, existing = {}, set()
+        for start in range(0, len(labels), 500):
+            chunk = [_sql_value(label) for label in labels[start:start + 500]]
+            marks = ', '.join('?' for _ in chunk)
+            for row_id, version in con.execute(f'SELECT row_id, version FROM deleted WHERE row_id IN ({marks})', chunk):
+                revisions[row_id] = version
+            for row_id, version in con.execute(f'SELECT row_id, _saved FROM tracker WHERE row_id IN ({marks})', chunk):
+                revisions[row_id] = version
+                existing.add(row_id)
+        return revisions, existing
+
+    def save(self, changes: dict, base: int = None) -> SaveResult:
+        conflicts = []
+        changes = journal.coerce_changeset(changes)
+        if not journal.is_empty(changes):
+            history = self.history()
+            if not history.started():
+                current = self.load()
+                history.start(current.attrs["rev"], current)
+            with self._lock, closing(self._connect()) as con:
+                con.execute('BEGIN IMMEDIATE')
+                try:
+                    revisions, existing = self._revisions(con, journal.touched(changes))
+                    next_free = con.execute('SELECT COALESCE(MAX(row_id), -1) + 1 FROM tracker').fetchone()[0]
+                    next_free = max([next_free] + [label + 1 for label in revisions])
+                    changes, conflicts = journal.resolve_conflicts(changes, revisions, base, existing, next_free)
+                    if journal.is_empty(changes):
+                        con.execute('ROLLBACK')
+                        return SaveResult(self.load(), conflicts)
+                    version = con.execute('UPDATE meta SET version = version + 1 RETURNING version').fetchone()[0]
+                    self._add_columns(con, {col for _, row in changes.get('upserts', []) for col in row})
+                    # Consecutive rows writing the same columns, as a bulk edit does, share one statement
+                    for columns, group in groupby(changes.get('upserts', []), key=lambda upsert: tuple(upsert[1])):
+                        group = list(group)
+                        names = ', '.join(['row_id', '_saved'] + [_quote(col) for col in columns])
+                        marks = ', '.join('?' for _ in range(len(columns) + 2))
+                        updates = ', '.join(f'{_quote(col)} = excluded.{_quote(col)}' for col in columns + ('_saved',))
+                        con.executemany(
+                            f'INSERT INTO tracker ({names}) VALUES ({marks}) ON CONFLICT(row_id) DO UPDATE SET {updates}',
+                            [(_sql_value(label), version, *(_sql_value(row[col]) for col in columns)) for label, row in group],
+                        )
+                        con.executemany('DELETE FROM deleted WHERE row_id = ?', [(_sql_value(label),) for label, _ in group])
+                    deleted = [(_sql_value(label),) for label in changes.get('deleted', [])]
+                    con.executemany('DELETE FROM tracker WHERE row_id = ?', deleted)
+                    con.executemany('INSERT OR REPLACE INTO deleted VALUES (?, ?)', [(label, version) for label, in deleted])
+                    con.execute('COMMIT')
+                except Exception:
+                    con.execute('ROLLBACK')
+                    raise
+                history.record(version, changes, self.load)
+        return SaveResult(self.load(), conflicts)
+
+    def replace(self, df: pd.DataFrame) -> None:
+        with self._lock, closing(self._connect()) as con:
+            con.execute('BEGIN IMMEDIATE')
+            try:
+                version = con.execute('UPDATE meta SET version = version + 1 RETURNING version').fetchone()[0]
+                # Tombstone the old rows so other processes drop those that are gone
+                con.execute('INSERT OR REPLACE INTO deleted SELECT row_id, ? FROM tracker', (version,))
+                con.execute('DELETE FROM tracker')
+                self._insert(con, df, version)
+                con.execute('DELETE FROM deleted WHERE row_id IN (SELECT row_id FROM tracker)')
+                self._index(con)
+                con.execute('COMMIT')
+            except Exception:
+                con.execute('ROLLBACK')
+                raise
+            self._frame = None
+            self.history().rebase(version, df)
+
+    def changed_since(self, rev: int) -> list:
+        if not self._exists():
+            return []
+        with closing(self._connect()) as con:
+            return [row[0] for row in con.execute(
+                'SELECT row_id FROM tracker WHERE _saved > ? UNION SELECT row_id FROM deleted WHERE version > ?',
+                (rev, rev),
+            )]
+
+    def history(self) -> History:
+        return History(history_dir(self.path))
+
+    def page_counts(self) -> pd.Series:
+        if not self._exists():
+            return pd.Series(dtype='int64')
+        with closing(self._connect()) as con:
+            con.execute('BEGIN')
+            version = con.execute('SELECT version FROM meta').fetchone()[0]
+            # The database groups the rows; nothing is loaded into the process cache
+            counts = _counts.get((self.path, version), lambda: self._count(con))
+            con.execute('COMMIT')
+        return counts
+
+    @staticmethod
+    def _count(con: sqlite3.Connection) -> pd.Series:
+        existing = {row[1] for row in con.execute('PRAGMA table_info(tracker)')}
+        keys = [col for col in COUNT_KEYS if col in existing]
+        if not keys:
+            return pd.Series(dtype='int64')
+        names = ', '.join(_quote(col) for col in keys)
+        grouped = apply_schema(pd.read_sql_query(f'SELECT {names}, COUNT(*) AS rows FROM tracker GROUP BY {names}', con))
+        if grouped.empty:
+            return pd.Series(dtype='int64')
+        return grouped.groupby(keys, observed=True, dropna=False)['rows'].sum().rename(None)
+
+
+def get_store(backend: str = None, project: Project = None) -> TrackerStore:
+    """
+    Returns the process-wide tracker store of a project
+
+    Every project keeps its rows in its own partition: its own CSV (and journal and snapshot)
+    or its own SQLite database, so loading one project never reads another's rows. A project
+    without data yet reads as an empty tracker; its files are created by its first save.
+
+    Args:
+        backend (str, optional): ``"csv"`` or ``"sqlite"``. Defaults to the ``TRACKER_STORE``
+            environment variable, or ``"csv"`` when it is not set.
+        project (Project, optional): Project whose rows to serve. Defaults to the first
+            registered project.
+
+    Returns:
+        TrackerStore: Store shared by every session of this process
+    """
+    backend = (backend or os.environ.get('TRACKER_STORE', 'csv')).lower()
+    project = project or get_project()
+    key = (backend, project.key)
+    with _stores_lock:
+        if key not in _stores:
+            if backend not in ('csv', 'sqlite'):
+                raise ValueError(f"Unknown tracker store {backend!r}; expected 'csv' or 'sqlite'")
+            if backend == 'csv':
+                _stores[key] = CsvStore(project.data_path)
+            else:
+                database = project.database
+                if project.database == DB_PATH:
+                    database = os.environ.get('TRACKER_DB', DB_PATH)
+                _stores[key] = SqliteStore(database, project.data_path)
+        return _stores[key]
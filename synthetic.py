@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+
+from schema import CYCLE_COLUMNS, EFFORT_COLUMN, ID_COLUMN, merge, progress, users
+
+HOST = 'https://www.mdwfp.com'
+NEW_HOST = 'https://test-mdwfp.pantheonsite.io'
+
+# Shares observed in folder/out.csv; a missing value is drawn as None
+STATE_WEIGHTS = {'Backlog': .904, 'Content Review': .060, 'In Progress': .022, 'Blocked': .013, 'Client Review': .001}
+USER_WEIGHTS = {None: .898, 'Sarah P': .045, 'Braden': .039, 'Jim': .013, 'Open': .004, 'Sarah C': .001}
+# Path depth below the host; the effort level is the slash count, so depth 0 is level 3
+DEPTH_WEIGHTS = {0: .007, 1: .023, 2: .201, 3: .460, 4: .309}
+FILLED = {'Notes': .205, 'Merge': .012, 'New URL': .079, 'Suggested Title': .386, 'Jira Epic': .79}
+
+SECTIONS = ['law-enforcement', 'fishing-boating', 'wildlife-hunting', 'state-parks', 'conservation',
+            'education-outreach', 'licenses', 'news', 'about', 'museum']
+WORDS = ['lake', 'river', 'deer', 'turkey', 'duck', 'bass', 'catfish', 'permit', 'season', 'rules',
+         'regulations', 'boating', 'camping', 'trail', 'hunter', 'education', 'youth', 'report',
+         'harvest', 'management', 'area', 'facility', 'shooting', 'program', 'events', 'guide']
+NOTES = [
+    "Page will be transformed into a richer, more image-heavy and engaging landing page. See designs. ",
+    "Content is outdated; confirm with the program lead before migrating.",
+    "Merge into the parent page.",
+    "PDF links need to be moved to the media library.",
+]
+
+# Days a page typically spends in each stage before moving on
+STAGE_DAYS = {'IP': 6, 'Content Review': 4, 'Client Review': 3}
+
+
+def _draw(rng: np.random.Generator, weights: dict, rows: int) -> np.ndarray:
+    choices = np.array(list(weights), dtype=object)
+    p = np.array(list(weights.values()), dtype=float)
+    return choices[rng.choice(len(choices), size=rows, p=p / p.sum())]
+
+
+def _sometimes(rng: np.random.Generator, values, share: float) -> pd.Series:
+    values = pd.Series(values, dtype='string')
+    return values.where(rng.random(len(values)) < share)
+
+
+def synthetic_tracker(rows: int, seed: int = 0, cycle_columns: bool = False) -> pd.DataFrame:
+    """
+    Generates a tracker frame shaped like ``folder/out.csv``
+
+    State, Users, Merge and the share of filled text cells follow the real tracker, URL depths
+    follow its effort levels, and every legacy URL is unique. The same ``rows`` and ``seed``
+    always give the same frame.
+
+    Args:
+        rows (int): Number of rows
+        seed (int, optional): Random seed. Defaults to 0.
+        cycle_columns (bool, optional): Also add the ``IP``, ``Content Review``,
+            ``Client Review`` and ``Done`` dates, filled up to each row's State. Defaults to False.
+
+    Returns:
+        pd.DataFrame: Tracker rows in the declared schema, labelled ``0 .. rows - 1``
+    """
+    rng = np.random.default_rng(seed)
+    depth = _draw(rng, DEPTH_WEIGHTS, rows).astype(np.int8)
+    section = np.array(SECTIONS, dtype=object)[rng.integers(len(SECTIONS), size=rows)]
+    words = np.array(WORDS, dtype=object)[rng.integers(len(WORDS), size=(rows, 4))]
+    # The row number in the last segment keeps URLs unique; top-level pages get it as a query
+    paths = [
+        '/'.join([section[row], *words[row, :level - 2], f'{words[row, level - 2]}-{row}']) + '/' if level > 1
+        else f'{section[row]}-{row}/' if level else f'?page_id={row}'
+        for row, level in enumerate(depth.tolist())
+    ]
+    titles = [' '.join(word.title() for word in words[row, :2]) for row in range(rows)]
+
+    frame = pd.DataFrame({
+        EFFORT_COLUMN: pd.array(depth + 3, dtype='Int8'),
+        'State': pd.Categorical(_draw(rng, STATE_WEIGHTS, rows), categories=progress),
+        'Users': pd.Categorical(_draw(rng, USER_WEIGHTS, rows), categories=users),
+        'Notes': _sometimes(rng, np.array(NOTES, dtype=object)[rng.integers(len(NOTES), size=rows)], FILLED['Notes']),
+        'Merge': pd.Categorical(np.where(rng.random(rows) < FILLED['Merge'], np.array(merge, dtype=object)[rng.integers(2, size=rows)], None),
+                                categories=merge),
+        'Legacy URL': pd.array([f'{HOST}/{path}' for path in paths], dtype='string'),
+        'New URL': _sometimes(rng, [f'{NEW_HOST}/{path.rstrip("/")}' for path in paths], FILLED['New URL']),
+        'Title': pd.array([f'MDWFP - {title}' for title in titles], dtype='string'),
+        'Suggested Title': _sometimes(rng, titles, FILLED['Suggested Title']),
+        'Jira Epic': _sometimes(rng, [f'MDWFP-{epic}' for epic in rng.integers(100, 200, size=rows)], FILLED['Jira Epic']),
+    })
+    if cycle_columns:
+        frame = frame.assign(**_cycle_dates(rng, frame['State']))
+    return frame
+
+
+def _cycle_dates(rng: np.random.Generator, state: pd.Series) -> dict:
+    """Stage dates in line with each row's State: a row in Client Review has IP and Content Review dates"""
+    reached = state.map({'In Progress': 1, 'Content Review': 2, 'Client Review': 3, 'Done': 4}).astype(float).fillna(0).to_numpy()
+    now = pd.Timestamp.now().normalize().to_datetime64()
+    day = np.timedelta64(1, 'D')
+    current = now - rng.integers(30, 365, size=len(state)) * day
+    dates = {}
+    for stage, column in enumerate(CYCLE_COLUMNS, start=1):
+        dates[column] = pd.Series(np.where(reached >= stage, current, np.datetime64('NaT')), index=state.index, dtype='datetime64[ns]')
+        hours = np.ceil(rng.exponential(STAGE_DAYS.get(column, 1) * 24, size=len(state))).astype(np.int64)
+        current = current + hours * np.timedelta64(1, 'h')
+    return dates
+
+
+def write_tracker(path: str, rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Writes a synthetic tracker CSV in the layout the tracker saves, page ids first
+
+    Args:
+        path (str): File to write
+        rows (int): Number of rows
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        pd.DataFrame: The rows that were written
+    """
+    frame = synthetic_tracker(rows, seed)
+    frame.to_csv(path, index_label=ID_COLUMN)
+    return frame
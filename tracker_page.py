@@ -0,0 +1,520 @@
+import os
+import uuid
+
+import pandas as pd
+import streamlit as st
+
+from filters import get_engine
+from journal import build_changeset, bulk_changeset, next_label
+from memo import freeze, session_memo
+from effort import EffortModel, effort_from_counts
+from export import FORMATS, available_formats, cache_stats, export_file, file_name
+from metrics import cached_page_counts, metrics_from_counts
+from overlay import Overlay
+from paging import DEFAULT_PAGE_SIZE, PAGE_SIZES, page_count, page_slice, sort_view
+from profiler import LOG_ENV, describe, latency_summary, profile, span
+from projects import get_project, projects_for
+from schema import merge, progress, users, with_categories
+from search import search, sync_index
+from startup import in_background, mark, timeline, wait
+from storage import get_store
+from transitions import STAGES, cached_cycle_times, save_with_transitions
+
+# Seconds a render waits for the background prefetch before loading the data itself
+PREWARM_WAIT = 30
+
+COLUMN_ORDER = ('count','State', 'Users', 'Notes','Merge','Legacy URL','New URL', 'Title', 'Suggested Title', 'Jira Epic')
+
+def filter_selections(df: pd.DataFrame, disabled: bool = False) -> dict:
+    """
+    Renders the filter widgets and collects what the viewer selected
+
+    Args:
+        df (pd.DataFrame): Original dataframe
+        disabled (bool, optional): Show the filters without letting them change, e.g. while the
+            editor has unsaved edits tied to the current view. Defaults to False.
+
+    Returns:
+        dict: Column to selected values (list), bounds (tuple) or pattern (str), as taken by
+        :meth:`filters.FilterEngine.apply`
+    """
+    modify = st.checkbox("Add filters", disabled=disabled)
+
+    if not modify:
+        return {}
+
+    engine = get_engine(df)
+    selections = {}
+    modification_container = st.container()
+
+    with modification_container:
+        to_filter_columns = st.multiselect("Filter table on", df.columns, disabled=disabled)
+        for column in to_filter_columns:
+            left, right = st.columns((1, 20))
+            left.write("↳")
+            index = engine.column(column)
+            if index.kind == 'category':
+                selections[column] = right.multiselect(
+                    f"Values for {column}",
+                    index.options,
+                    default=index.options,
+                    disabled=disabled,
+                )
+            elif index.kind == 'numeric':
+                _min, _max = index.bounds
+                if _min is None:
+                    continue
+                step = (_max - _min) / 100 or 1.0
+                selections[column] = right.slider(
+                    f"Values for {column}",
+                    _min,
+                    _max,
+                    (_min, _max),
+                    step=step,
+                    disabled=disabled,
+                )
+            elif index.kind == 'datetime':
+                if index.bounds[0] is None:
+                    continue
+                user_date_input = right.date_input(
+                    f"Values for {column}",
+                    value=index.bounds,
+                    disabled=disabled,
+                )
+                if len(user_date_input) == 2:
+                    start_date, end_date = map(pd.to_datetime, user_date_input)
+                    selections[column] = (start_date, end_date + pd.Timedelta(days=1) - pd.Timedelta(1))
+            else:
+                user_text_input = right.text_input(
+                    f"Substring or regex in {column}",
+                    disabled=disabled,
+                )
+                if user_text_input:
+                    selections[column] = user_text_input
+
+    return selections
+
+
+def build_view(df: pd.DataFrame, selections: dict, query: str, sort_by: str = None, descending: bool = False,
+               store=None) -> pd.DataFrame:
+    """
+    Filters, searches and sorts the tracker for the editor
+
+    Args:
+        df (pd.DataFrame): Full tracker frame
+        selections (dict): Filter widget values from :func:`filter_selections`
+        query (str): Search box text; matches keep their rank order unless a sort is chosen
+        sort_by (str, optional): Column to sort by. Defaults to None.
+        descending (bool, optional): Sort largest first. Defaults to False.
+        store (storage.TrackerStore, optional): Store ``df`` came from. Defaults to the first project's.
+
+    Returns:
+        pd.DataFrame: Rows to page through
+    """
+    view = get_engine(df).apply(selections)
+    if query:
+        ranked = pd.Index([label for label, _ in search(df, store or get_store(), query)])
+        view = view.loc[ranked[ranked.isin(view.index)]]
+    return sort_view(df, view, sort_by, descending)
+
+
+def getData(project=None):
+    project = project or get_project()
+    with span('getData') as timing:
+        # Only the columns the page shows are read from the snapshot, and only the project's rows
+        df = get_store(project=project).load(columns=COLUMN_ORDER)
+        # The editor offers the project's own users and states, so the columns must accept them
+        df = with_categories(df, {'Users': project.users, 'State': project.states})
+        timing.update(describe(df))
+    return df
+
+
+def save_edits(force=False, project=None):
+    """
+    Saves the pending data editor edits to the session's project
+
+    Rows that somebody else saved after this session started editing are left out and kept in
+    ``st.session_state["conflicts"]`` unless ``force`` is set. Once everything is saved the
+    editor is cleared.
+    """
+    project = project or get_project()
+    store = get_store(project=project)
+    with profile('save', session=st.session_state.get("session_id")) as profiler:
+        changes = build_changeset(st.session_state.get(1234), st.session_state["editor_labels"], next_label(store.load(columns=[])))
+        base = None if force else st.session_state.get("base_rev")
+        with profiler.span('save', rows=len(changes['upserts']) + len(changes['deleted'])):
+            result = save_with_transitions(store, changes, base=base, user=st.session_state.get("user"), path=project.log_path)
+    st.session_state["conflicts"] = result.conflicts
+    if not result.conflicts:
+        del st.session_state[1234]
+
+
+def render(admin: bool = False):
+    """
+    Shows the tracker page to a logged-in user, profiling the rerun
+
+    Args:
+        admin (bool, optional): Also show the performance panel. Defaults to False.
+    """
+    with profile('rerun', session=st.session_state.setdefault("session_id", uuid.uuid4().hex[:8])) as profiler:
+        allowed = projects_for(st.session_state.get("user"))
+        if not allowed:
+            st.error("You are not a member of any project.")
+            return
+        project = select_project(allowed)
+        with span('prewarm wait'):
+            # Reuse what the login-time prefetch is still building instead of building it twice
+            wait('prewarm', PREWARM_WAIT)
+        tracker_page(project)
+        with span('history'):
+            history_panel(project, admin)
+        if len(allowed) > 1:
+            with st.expander("All projects"):
+                with span('rollup', rows=len(allowed)):
+                    st.dataframe(project_rollup(allowed))
+        if admin:
+            performance_panel(profiler)
+    mark('first tracker page')
+
+
+def select_project(allowed: list):
+    """
+    The project this session works on, picked in the sidebar when the user may open several
+
+    Args:
+        allowed (list): Projects the logged-in user may open, from :func:`projects.projects_for`
+
+    Returns:
+        projects.Project: The selected project; the first one until another is picked
+    """
+    keys = [project.key for project in allowed]
+    if st.session_state.get("project") not in keys:
+        st.session_state["project"] = keys[0]
+    if len(keys) > 1:
+        st.sidebar.selectbox("Project", keys, format_func=lambda key: get_project(key).title, key="project",
+                             on_change=discard_edits)
+    return get_project(st.session_state["project"])
+
+
+def discard_edits():
+    """Drops the editor's pending edits and conflicts, which belong to the project being left"""
+    st.session_state.pop(1234, None)
+    st.session_state.pop("conflicts", None)
+
+
+def bulk_edit(project, labels: pd.Index, values: dict, base: int):
+    """
+    Sets the same values on many pages in one save
+
+    Pages that already hold the values are skipped, and pages somebody else saved after
+    revision ``base`` are left as they are. The save is one journal entry or transaction, and
+    its State changes are logged as one batch of transitions.
+
+    Args:
+        project (projects.Project): Project to save to
+        labels (pd.Index): Page ids to set
+        values (dict): Column to the new value
+        base (int): Store revision the pages were selected at
+    """
+    store = get_store(project=project)
+    with profile('bulk edit', session=st.session_state.get("session_id")) as profiler:
+        changes = bulk_changeset(store.load(columns=list(values)), labels, values)
+        with profiler.span('save', rows=len(changes['upserts'])):
+            result = save_with_transitions(store, changes, base=base, user=st.session_state.get("user"), path=project.log_path)
+    saved = len(changes['upserts']) - len(result.conflicts)
+    message = f"Updated {saved} of {len(labels)} page(s)"
+    if result.conflicts:
+        message += f"; {len(result.conflicts)} were changed by someone else meanwhile and were left as they are"
+    st.session_state["bulk_result"] = message + '.'
+
+
+def history_panel(project, admin: bool = False):
+    """
+    Shows what changed in the project between two dates, and lets admins restore a past version
+
+    Nothing is read from the history while the panel is closed.
+
+    Args:
+        project (projects.Project): Project to show
+        admin (bool, optional): Offer the restore button. Defaults to False.
+    """
+    store = get_store(project=project)
+    history = store.history()
+    panel = st.expander("History", key="history_open", on_change="rerun")
+    with panel:
+        if not panel.open:
+            return
+        versions = history.versions()
+        if versions.empty:
+            st.write('No saves have been recorded yet.')
+            return
+        first, today = versions['ts'].iloc[0].date(), pd.Timestamp.now(tz='UTC').date()
+        dates = st.date_input("Changes made between", value=(max(first, today - pd.Timedelta(days=7)), today),
+                              min_value=first, max_value=today, key="history_dates")
+        if len(dates) == 2:
+            # From the state before the first day began to the state at the end of the last day
+            start = history.seq_at(pd.Timestamp(dates[0])) or int(versions['seq'].iloc[0])
+            end = history.seq_at(pd.Timestamp(dates[1]) + pd.Timedelta(days=1)) or start
+            changes = history.diff(start, end)
+            urls = store.load(columns=['Legacy URL'])['Legacy URL']
+            changes.insert(1, 'Legacy URL', changes['row'].map(urls))
+            st.caption(f"{len(changes)} change(s) between revisions {start} and {end}")
+            st.dataframe(changes.head(5000), hide_index=True)
+
+        if admin:
+            recent = versions.iloc[::-1].head(50)
+            seq = st.selectbox("Version", recent['seq'].tolist(), key="history_version", format_func=lambda seq: (
+                f"Revision {seq} · {recent.loc[recent['seq'] == seq, 'ts'].iloc[0]:%Y-%m-%d %H:%M} UTC"))
+            st.button("Restore this version", on_click=restore_version, args=(project, seq),
+                      help="Saves the differences as a new version, which can be undone in turn")
+
+
+def restore_version(project, seq: int):
+    """Brings the project back to a past revision by saving the differences as a new edit"""
+    store = get_store(project=project)
+    current = store.load(columns=[])
+    changes = store.history().restore_changes(seq, current.attrs["rev"])
+    save_with_transitions(store, changes, user=st.session_state.get("user"), path=project.log_path)
+    discard_edits()
+
+
+def project_rollup(projects: list) -> pd.DataFrame:
+    """
+    One row of totals per project, for the cross-project view
+
+    The totals are summed from each project's page counts (see
+    :meth:`storage.TrackerStore.page_counts`), which its store keeps per revision: a project
+    whose data did not change since the last rollup is not counted again, and the SQLite store
+    counts in the database without loading the project's rows.
+
+    Args:
+        projects (list): Projects to include
+
+    Returns:
+        pd.DataFrame: Pages, pages per stage and estimated hours per project, plus a total row
+    """
+    rows, columns = {}, ['Pages']
+    for project in projects:
+        counts = get_store(project=project).page_counts()
+        total = int(counts.sum())
+        metrics = metrics_from_counts(counts, total)
+        effort = effort_from_counts(counts, total, EffortModel.for_project(project))
+        stages = list(project.stages) or STAGES
+        columns += [stage for stage in stages if stage not in columns]
+        rows[project.title] = {'Pages': metrics.total, **{stage: metrics.state(stage) for stage in stages},
+                               'Hours': effort.total_hours}
+    table = pd.DataFrame.from_dict(rows, orient='index', columns=columns + ['Hours']).fillna(0)
+    table.loc['All projects'] = table.sum()
+    return table.astype({col: 'int64' for col in columns})
+
+
+def prewarm():
+    """
+    Loads the page's data and builds what its first render needs, off the script thread
+
+    The frame, the page counts the metrics and effort estimate are summed from and the cycle times, then the filter indexes
+    of every column and the search index all go into their process-wide caches, keyed by data
+    version, so any session rendering the same version finds them ready. A render only waits for the first
+    part; the indexes are not needed until somebody filters or searches.
+    """
+    store = get_store()
+    df = store.load(columns=COLUMN_ORDER)
+    cached_page_counts(df)
+    cached_cycle_times()
+    in_background('indexes', lambda: build_indexes(df, store))
+
+
+def build_indexes(df: pd.DataFrame, store):
+    """Builds the filter index of every column and syncs the search index for a frame"""
+    engine = get_engine(df)
+    for column in df.columns:
+        engine.column(column)
+    sync_index(df, store)
+
+
+def performance_panel(profiler):
+    """Shows where the time of this rerun went and the rerun latency of the whole process"""
+    with st.expander("Performance (admin)"):
+        spans = pd.DataFrame(profiler.spans, columns=['name', 'seconds', 'rows', 'bytes'])
+        st.write(f"This rerun so far: {profiler.elapsed * 1000:.0f} ms")
+        st.dataframe(spans.assign(ms=spans['seconds'] * 1000, MB=spans['bytes'] / 2**20).drop(columns=['seconds', 'bytes']).round(2),
+                     hide_index=True)
+        st.write('Latency across all sessions of this server (seconds)')
+        st.dataframe(latency_summary().round(3))
+        if os.environ.get(LOG_ENV):
+            st.caption(f"Profiles are also written to {os.environ[LOG_ENV]}")
+        else:
+            st.caption(f"Set {LOG_ENV} to a file path to keep every profile as JSON lines")
+        exports = cache_stats()
+        st.caption(f"Export cache: {exports['entries']} chunks, {exports['bytes'] / 2**20:.1f} MB")
+        st.write('Startup of this server (seconds since the app was first loaded)')
+        st.dataframe(pd.DataFrame(timeline(), columns=['milestone', 'seconds']).round(3), hide_index=True)
+
+
+def tracker_page(project=None):
+    project = project or get_project()
+    store = get_store(project=project)
+    names = list(project.users) or users
+    states = list(project.states) or progress
+    stages = list(project.stages) or STAGES
+    levels = list(EffortModel.for_project(project).hours)
+    df = getData(project)
+    edits = st.session_state.get(1234)
+    if not (edits and any(edits.values())):
+        # Nothing pending: edits made from here on are checked against this revision
+        st.session_state["base_rev"] = df.attrs["rev"]
+    
+    
+    config = {
+      'count' : st.column_config.NumberColumn('effort', step=1, min_value=min(levels), max_value=max(levels)),  
+      'Users' : st.column_config.SelectboxColumn('Name', options=names),
+      'State' : st.column_config.SelectboxColumn('State', options=states, default=states[0]),
+      'Merge' : st.column_config.SelectboxColumn('Merge', options=merge, width="Large"),
+      'Notes': st.column_config.TextColumn('Notes', width="Large"),
+      'New URL': st.column_config.TextColumn('New URL', width="Medium"),
+      'Legacy URL': st.column_config.LinkColumn('Legacy URL', help="URL to old site", validate="^https://[a-z]+\.streamlit\.app$",
+            max_chars=100,)
+      
+        }
+    st.markdown('This table provides a view of the stories based on the filters that have been applied.')
+    st.link_button("Figma Design", "https://www.figma.com/file/e6ygQs8uULxi9tx16aGnhu/Low-fidelity-Mock-ups?type=design&node-id=333%3A1743&mode=design&t=6GZLiRRRPt0HXqxG-1")
+    st.markdown('Check the add filters box to see the filter options. Filters can be grouped by selecting multiple columns. ')
+    memo = session_memo(st.session_state)
+    # Only one page is sent to the editor; edits on it are mapped back through its row positions,
+    # so the page's rows are pinned from the first edit until the edits are saved or discarded
+    pending = bool(edits and any(edits.values()))
+    with span('filters'):
+        selections = filter_selections(df, disabled=pending)
+    query = st.text_input("Search pages", placeholder="Words from a title or note, or part of a URL", disabled=pending)
+    sort_col, order_col, size_col, page_col = st.columns(4)
+    sort_by = sort_col.selectbox("Sort by", [None] + list(df.columns), format_func=lambda col: 'Unsorted' if col is None else col, disabled=pending)
+    descending = order_col.toggle("Descending", disabled=pending)
+    size = size_col.selectbox("Rows per page", PAGE_SIZES, index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE), disabled=pending)
+    # The memo keeps row positions rather than frames; a page is then one small take
+    with span('view') as timing:
+        rows = memo.get(
+            ('view', df.attrs.get("version"), freeze(selections), query, sort_by, descending, COLUMN_ORDER),
+            lambda: df.index.get_indexer(build_view(df, selections, query, sort_by, descending, store).index),
+        )
+        timing.update(rows=len(rows), bytes=rows.nbytes)
+    pages = page_count(len(rows), size)
+    page = page_col.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, disabled=pending)
+    if pending and "editor_labels" in st.session_state:
+        # Other sessions' saves may move rows in or out of the view meanwhile; the pinned rows
+        # keep their positions, and a row deleted since is kept as a blank one
+        page_df = df.reindex(st.session_state["editor_labels"])
+    else:
+        page_df = df.iloc[page_slice(rows, page, size)]
+        st.session_state["editor_labels"] = page_df.index
+    st.caption(f"Rows {(page - 1) * size + 1 if len(rows) else 0}–{(page - 1) * size + len(page_df)} of {len(rows)}"
+               + (" · save your changes to change the filters, search, sort or page" if pending else ""))
+    with span('data_editor', **describe(page_df)):
+        st.data_editor(page_df,column_config=config, column_order=COLUMN_ORDER,key=1234 )
+    
+    # The shared frame is never written to; the session's unsaved edits are kept beside it
+    with span('overlay', rows=sum(len(cells) for cells in (edits or {}).get('edited_rows', {}).values())):
+        overlay = Overlay.from_editor(df, edits, page_df.index) if pending else Overlay(df, {})
+
+    st.button("Save", on_click=save_edits, kwargs={"project": project})
+
+
+    st.write('Make sure you save your changes')
+
+    conflicts = st.session_state.get("conflicts")
+    if conflicts:
+        changed = df.loc[df.index.intersection(conflicts), 'Legacy URL'].fillna('').tolist()
+        st.warning(f"{len(conflicts)} row(s) were changed by someone else since you started editing and were not saved: " + ', '.join(changed))
+        st.button("Overwrite their changes", on_click=save_edits, kwargs={"force": True, "project": project})
+
+    with st.expander("Bulk edit"):
+        st.write('Set the same values on many pages at once. The change is saved as one edit.')
+        scope = st.radio("Pages", ['Current view', 'Legacy URL prefix'], horizontal=True, key="bulk_scope")
+        if scope == 'Current view':
+            targets = df.index[rows]
+        else:
+            prefix = st.text_input("Legacy URL starts with", placeholder="https://www.mdwfp.com/fishing", key="bulk_prefix")
+            targets = memo.get(('prefix', df.attrs.get("version"), prefix), lambda: df.index[
+                df['Legacy URL'].astype('string').str.startswith(prefix, na=False).to_numpy(dtype=bool)] if prefix else df.index[:0])
+        state_col, user_col, merge_col, epic_col = st.columns(4)
+        unchanged = lambda value: 'Unchanged' if value is None else value
+        values = {
+            'State': state_col.selectbox('State', [None] + states, format_func=unchanged, key="bulk_state"),
+            'Users': user_col.selectbox('Name', [None] + names, format_func=unchanged, key="bulk_user"),
+            'Merge': merge_col.selectbox('Merge', [None] + merge, format_func=unchanged, key="bulk_merge"),
+            'Jira Epic': epic_col.text_input('Jira Epic', placeholder='Unchanged', key="bulk_epic").strip() or None,
+        }
+        values = {column: value for column, value in values.items() if value is not None}
+        st.button(f"Apply to {len(targets)} pages", on_click=bulk_edit, args=(project, targets, values, df.attrs["rev"]),
+                  disabled=pending or not values or not len(targets))
+        if pending:
+            st.caption('Save your changes in the table first')
+        result = st.session_state.pop("bulk_result", None)
+        if result:
+            st.success(result)
+
+    with st.expander("Export"):
+        st.write('Download the saved rows of the current view, with the filters, search and sort applied.')
+        fmt = st.radio("Format", available_formats(), format_func=lambda fmt: FORMATS[fmt][0], horizontal=True)
+        # Built in chunks only when clicked, off the script thread
+        st.download_button(f"Download {len(rows)} rows", data=lambda: export_file(df.iloc[rows], fmt),
+                           file_name=file_name(project.title, fmt), mime=FORMATS[fmt][1], on_click='ignore')
+
+    with span('metrics', rows=len(overlay)):
+        metrics = memo.get(('metrics', overlay.version), overlay.metrics)
+    stats = memo.stats()
+    st.sidebar.caption(f"View cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%}), "
+                       f"{stats['entries']} entries, {stats['bytes'] / 2**20:.1f} MB")
+
+    with st.expander("Story Metrics"):
+        st.write('Story status metrics')
+        for col, state in zip(st.columns(len(stages)), stages):
+            col.metric(state, metrics.state(state))
+            col.metric('%', metrics.state_percent(state))
+
+
+    with st.expander("Migrator Metrics"):
+        st.write('Number of stories assigned to each migrator')
+        for col, name in zip(st.columns(len(names)), names):
+            col.metric(name, metrics.user(name))
+
+
+
+#effort stats
+
+    with st.expander("Estimation"):
+        st.write('Estimation of the # of hours assocaited with each page category. ')
+        model = EffortModel.for_project(project)
+        with span('effort', rows=len(overlay)):
+            effort = memo.get(('effort', overlay.version, model.key), lambda: overlay.effort(model))
+        for col, (level, row) in zip(st.columns(len(effort.levels)), effort.levels.iterrows()):
+            col.metric(f'Level {level}', int(row['pages']))
+            col.metric(f"Hours (*{row['hours per page']:g})" if pd.notna(row['hours per page']) else 'Hours (no estimate)',
+                       row['hours'] if pd.notna(row['hours']) else '-')
+        st.metric('Total hours', effort.total_hours)
+        if effort.unestimated:
+            unknown = ', '.join(str(level) for level in effort.unknown_levels()) or 'none'
+            st.warning(f"{effort.unestimated} page(s) have no estimate: their effort level is missing or has no hours "
+                       f"configured (levels {unknown}).")
+        if not effort.by_user_state.empty:
+            st.write('Estimated hours by migrator and state')
+            st.dataframe(effort.by_user_state.assign(Total=effort.users).round(1))
+
+
+#Cycle time view
+        
+        
+    with st.expander("Cycle times"):
+        st.write('Time from one state to the next')
+        with span('cycle times'):
+            cycles = cached_cycle_times(project.log_path, stages)
+        if cycles.stages.empty:
+            st.write('No state changes have been saved yet.')
+        else:
+            days = pd.Timedelta(days=1)
+            st.dataframe(cycles.stages.assign(**{col: cycles.stages[col] / days for col in ('median', 'mean', 'total')}).round(1),
+                         column_config={'median': 'Median days', 'mean': 'Mean days', 'total': 'Total days'})
+            col16, col17, col18 = st.columns(3)
+            col16.metric('Pages done', int(cycles.throughput.sum()))
+            col17.metric('Median lead time (days)', round(cycles.lead_times.median() / days, 1) if len(cycles.lead_times) else '-')
+            col18.metric('Done in the latest week', int(cycles.throughput.iloc[-1]) if len(cycles.throughput) else 0)
+            st.bar_chart(cycles.throughput.rename('Pages done per week'))
@@ -0,0 +1,221 @@
+import io
+import os
+import threading
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+import journal
+from memo import SharedMemo
+
+LOG_PATH = 'folder/transitions.csv'
+LOG_COLUMNS = ['row', 'from_state', 'to_state', 'user', 'ts']
+
+# Stages a page moves through, in order; lead time runs from leaving the first to reaching the last
+STAGES = ['Backlog', 'In Progress', 'Content Review', 'Client Review', 'Done']
+
+_lock = threading.RLock()
+_logs = {}
+_memo = SharedMemo(16)
+
+
+def _empty_log() -> pd.DataFrame:
+    return pd.DataFrame({
+        'row': pd.Series(dtype='int64'),
+        'from_state': pd.Series(dtype='string'),
+        'to_state': pd.Series(dtype='string'),
+        'user': pd.Series(dtype='string'),
+        'ts': pd.Series(dtype='datetime64[ns, UTC]'),
+    })
+
+
+def _parse(data: bytes, header: bool) -> pd.DataFrame:
+    if not data:
+        return _empty_log()
+    frame = pd.read_csv(
+        io.BytesIO(data), header=0 if header else None, names=LOG_COLUMNS,
+        dtype={'row': 'int64', 'from_state': 'string', 'to_state': 'string', 'user': 'string'},
+    )
+    frame['ts'] = pd.to_datetime(frame['ts'], utc=True, format='ISO8601')
+    return frame
+
+
+def read_log(path: str = LOG_PATH) -> pd.DataFrame:
+    """
+    Returns every recorded state transition, reading only what was appended since the last call
+
+    Args:
+        path (str, optional): Transition log. Defaults to ``folder/transitions.csv``.
+
+    Returns:
+        pd.DataFrame: ``row``, ``from_state``, ``to_state``, ``user`` and ``ts`` (UTC) per
+        transition, oldest first; ``attrs["version"]`` identifies the log's length
+    """
+    with _lock:
+        cached = _logs.get(path)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if cached is None or size < cached["offset"]:
+            cached = _logs[path] = {"offset": 0, "frame": _empty_log()}
+        if size > cached["offset"]:
+            with open(path, 'rb') as handle:
+                handle.seek(cached["offset"])
+                data = handle.read()
+            complete = data[:data.rfind(b'\n') + 1]
+            new = _parse(complete, header=cached["offset"] == 0)
+            cached["frame"] = pd.concat([cached["frame"], new], ignore_index=True) if len(cached["frame"]) else new
+            cached["offset"] += len(complete)
+        view = cached["frame"].copy(deep=False)
+    view.attrs["version"] = (path, cached["offset"])
+    return view
+
+
+def append_transitions(transitions: pd.DataFrame, path: str = LOG_PATH) -> None:
+    """
+    Appends transitions to the log
+
+    Args:
+        transitions (pd.DataFrame): Rows with the ``LOG_COLUMNS``
+        path (str, optional): Transition log. Defaults to ``folder/transitions.csv``.
+    """
+    if transitions.empty:
+        return
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    utc = transitions['ts'].dt.tz_convert(None).to_numpy(dtype='datetime64[us]')
+    rows = transitions[LOG_COLUMNS].assign(ts=np.char.add(np.datetime_as_string(utc, unit='us'), 'Z'))
+    with _lock:
+        header = not os.path.exists(path) or os.path.getsize(path) == 0
+        with open(path, 'a', encoding='utf-8', newline='') as handle:
+            rows.to_csv(handle, header=header, index=False)
+
+
+def state_changes(before: pd.DataFrame, after: pd.DataFrame, labels, user: str = None, ts=None) -> pd.DataFrame:
+    """
+    Compares the State of the given rows before and after a save
+
+    Only rows whose State actually differs become transitions; rows new in ``after`` come from
+    no state, deleted rows are left out.
+
+    Args:
+        before (pd.DataFrame): Tracker rows before the save
+        after (pd.DataFrame): Tracker rows after the save
+        labels: Rows the save touched
+        user (str, optional): Who saved. Defaults to None.
+        ts (optional): When. Defaults to now.
+
+    Returns:
+        pd.DataFrame: Transitions with the ``LOG_COLUMNS``
+    """
+    if 'State' not in after.columns:
+        return _empty_log()
+    labels = after.index.intersection(pd.Index(list(labels)))
+    new = after['State'].reindex(labels).astype('string')
+    old = before['State'].reindex(labels).astype('string') if 'State' in before.columns else pd.Series(pd.NA, index=labels, dtype='string')
+    changed = (new.fillna('') != old.fillna('')).to_numpy()
+    ts = pd.Timestamp.now(tz='UTC') if ts is None else pd.Timestamp(ts)
+    ts = ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC')
+    count = int(changed.sum())
+    return pd.DataFrame({
+        'row': labels[changed].astype('int64'),
+        'from_state': old[changed].to_numpy(),
+        'to_state': new[changed].to_numpy(),
+        'user': pd.array([user] * count, dtype='string'),
+        'ts': pd.Series([ts] * count, dtype='datetime64[ns, UTC]').to_numpy(),
+    })
+
+
+def save_with_transitions(store, changes: dict, base: int = None, user: str = None, path: str = LOG_PATH):
+    """
+    Saves a change set and logs the State transitions it committed
+
+    Args:
+        store (storage.TrackerStore): Store to save to
+        changes (dict): Change set from :func:`journal.build_changeset`
+        base (int, optional): Revision the change set was made against. Defaults to None.
+        user (str, optional): Who saved. Defaults to None.
+        path (str, optional): Transition log. Defaults to ``folder/transitions.csv``.
+
+    Returns:
+        storage.SaveResult: Result of the save
+    """
+    before = store.load(columns=['State'])
+    result = store.save(changes, base=base)
+    committed = set(journal.touched(changes)).difference(result.conflicts)
+    # Added rows may have been moved to other labels; those are the ones missing from ``before``
+    committed.update(result.frame.index.difference(before.index))
+    append_transitions(state_changes(before, result.frame, committed, user), path)
+    return result
+
+
+@dataclass(frozen=True)
+class CycleTimes:
+    """Per-stage durations, lead times and weekly throughput derived from the transition log"""
+
+    stages: pd.DataFrame = field(default_factory=pd.DataFrame)
+    lead_times: pd.Series = field(default_factory=lambda: pd.Series(dtype='timedelta64[ns]'))
+    throughput: pd.Series = field(default_factory=lambda: pd.Series(dtype='int64'))
+
+
+def compute_cycle_times(log: pd.DataFrame, now=None, freq: str = 'W', stages: list = None) -> CycleTimes:
+    """
+    Derives cycle-time statistics from the transition log in a few vectorized passes
+
+    Every transition opens a stay in its ``to_state`` that the row's next transition closes;
+    stays still open count up to ``now``. Lead time is the time from a row's first transition
+    out of Backlog to its first arrival in Done.
+
+    Args:
+        log (pd.DataFrame): Output of :func:`read_log`
+        now (optional): End of stays that are still open. Defaults to now.
+        freq (str, optional): Bucket size for throughput. Defaults to weekly.
+        stages (list, optional): The project's stages, in order. Defaults to ``STAGES``.
+
+    Returns:
+        CycleTimes: ``stages`` (pages, median, mean and total time per state, open stays
+        included), ``lead_times`` (per row) and ``throughput`` (rows reaching Done per bucket)
+    """
+    if log.empty:
+        return CycleTimes()
+    sequence = list(stages or STAGES)
+    now = pd.Timestamp.now(tz='UTC') if now is None else pd.Timestamp(now)
+    now = now.tz_convert(None) if now.tzinfo else now
+    # Naive UTC datetime64 keeps every step below in numpy
+    times = log['ts'].dt.tz_convert(None).to_numpy(dtype='datetime64[ns]')
+    order = np.lexsort((times, log['row'].to_numpy()))
+    log = log.iloc[order].assign(ts=times[order])
+    rows = log['row'].to_numpy()
+    starts = times[order]
+    same_row = np.r_[rows[1:] == rows[:-1], False]
+    ends = np.where(same_row, np.r_[starts[1:], starts[:1]], np.datetime64(now.to_datetime64(), 'ns'))
+    stays = pd.DataFrame({'row': rows, 'state': log['to_state'].to_numpy(), 'duration': ends - starts})
+
+    per_row = stays.groupby(['state', 'row'], sort=False)['duration'].sum()
+    per_state = per_row.groupby(level='state').agg(['count', 'median', 'mean', 'sum'])
+    per_state.columns = ['pages', 'median', 'mean', 'total']
+    per_state = per_state.reindex([s for s in sequence if s in per_state.index] + [s for s in per_state.index if s not in sequence])
+
+    leaving = log['from_state'].fillna(sequence[0]).eq(sequence[0]) & log['to_state'].ne(sequence[0])
+    started = log[leaving].groupby('row')['ts'].min()
+    done = log[log['to_state'] == sequence[-1]].groupby('row')['ts'].min()
+    lead_times = (done - started.reindex(done.index)).dropna()
+    lead_times = lead_times[lead_times >= pd.Timedelta(0)]
+
+    throughput = done.to_frame().set_index('ts').resample(freq).size() if len(done) else CycleTimes().throughput
+    return CycleTimes(stages=per_state, lead_times=lead_times, throughput=throughput)
+
+
+def cached_cycle_times(path: str = LOG_PATH, stages: list = None) -> CycleTimes:
+    """
+    Returns the cycle times for the current log, recomputed only when transitions were appended
+
+    Open stays are counted up to the moment the result was computed.
+
+    Args:
+        path (str, optional): Transition log. Defaults to ``folder/transitions.csv``.
+        stages (list, optional): The project's stages, in order. Defaults to ``STAGES``.
+
+    Returns:
+        CycleTimes: Statistics for the log
+    """
+    log = read_log(path)
+    return _memo.get((log.attrs["version"], tuple(stages or STAGES)), lambda: compute_cycle_times(log, stages=stages))
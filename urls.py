@@ -0,0 +1,136 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+import schema
+
+# Most distinct URLs whose analysis is kept; the cache starts over past this
+CACHE_SIZE = 500_000
+
+FIELDS = ('path', 'section', 'depth', 'slashes', 'has_query', 'has_fragment')
+
+_URL = (
+    r"^(?:(?P<scheme>[a-zA-Z][a-zA-Z0-9+.-]*):)?(?://(?P<host>[^/?#]*))?"
+    r"(?P<path>[^?#]*)(?P<query>\?[^#]*)?(?P<fragment>#.*)?$"
+)
+
+_lock = threading.Lock()
+# Parsed URLs: position of each URL in the cached column arrays
+_positions = {}
+_columns = {}
+
+
+def _present(group: pa.Array) -> np.ndarray:
+    """True where an optional regex group matched (unmatched groups come back empty)"""
+    return pc.fill_null(pc.greater(pc.utf8_length(group), 0), False).to_numpy(zero_copy_only=False)
+
+
+def _parse(urls: list) -> dict:
+    """Analyzes distinct, non-missing URLs in bulk with pyarrow's string kernels"""
+    array = pa.array(urls, type=pa.large_string())
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+    array = pc.utf8_trim_whitespace(array)
+    parts = pc.extract_regex(array, _URL)
+
+    path = pc.utf8_lower(pc.fill_null(pc.struct_field(parts, 'path'), ''))
+    path = pc.replace_substring_regex(path, r"/{2,}", '/')
+    path = pc.replace_substring_regex(path, r"^/?", '/')
+    path = pc.replace_substring_regex(path, r"(.)/$", r"\1")
+    segments = pc.list_slice(pc.split_pattern(path, '/'), 1)
+    depth = pc.list_value_length(segments)
+    depth = pc.if_else(pc.equal(path, '/'), 0, depth)
+    section = pc.if_else(pc.greater(depth, 0), pc.list_element(pc.fill_null(segments, []), 0), None)
+
+    return {
+        'path': path.to_numpy(zero_copy_only=False),
+        'section': section.to_numpy(zero_copy_only=False),
+        'depth': depth.to_numpy(zero_copy_only=False).astype(np.int16),
+        'slashes': pc.count_substring(array, '/').to_numpy(zero_copy_only=False).astype(np.int16),
+        'has_query': _present(pc.struct_field(parts, 'query')),
+        'has_fragment': _present(pc.struct_field(parts, 'fragment')),
+    }
+
+
+def analyze_urls(urls: pd.Series) -> pd.DataFrame:
+    """
+    Breaks a column of URLs down into the parts the tracker reports on
+
+    Each distinct URL is parsed once per process: the cached results are looked up for the
+    whole column at once and only unseen URLs are parsed, in one vectorized pass.
+
+    Args:
+        urls (pd.Series): URLs such as the ``Legacy URL`` or ``New URL`` column
+
+    Returns:
+        pd.DataFrame: With the index of ``urls`` and the columns ``path`` (lower-case path
+        without query, fragment, repeated or trailing slashes), ``section`` (first path segment),
+        ``depth`` (number of path segments), ``slashes`` (every ``/`` in the URL),
+        ``has_query`` and ``has_fragment``; all missing where the URL is missing
+    """
+    global _positions, _columns
+    codes, uniques = pd.factorize(urls.astype('string'), use_na_sentinel=True)
+    uniques = uniques.tolist()
+    with _lock:
+        positions, columns = _positions, _columns
+    found = np.fromiter((positions.get(url, -1) for url in uniques), dtype=np.int64, count=len(uniques))
+    fresh = found < 0
+    if fresh.any():
+        missing = [url for url, new in zip(uniques, fresh) if new]
+        parsed = _parse(missing)
+        # The result is taken from the snapshot plus the new rows, so it never depends on
+        # what other threads (or the eviction below) do to the shared cache meanwhile
+        snapshot, cached = columns, len(columns['path']) if columns else 0
+        found[fresh] = np.arange(cached, cached + len(missing))
+        columns = {field: np.concatenate([columns[field], parsed[field]]) if columns else parsed[field] for field in FIELDS}
+        with _lock:
+            if len(_positions) + len(missing) > CACHE_SIZE:
+                _positions, _columns = {}, {}
+            if len(missing) <= CACHE_SIZE:
+                if _columns is snapshot:
+                    # Nobody cached anything since the snapshot: the new rows go right after it
+                    _positions.update(zip(missing, range(cached, cached + len(missing))))
+                    _columns = columns
+                else:
+                    # Other threads may have cached some of the same URLs meanwhile; only the
+                    # rest are appended, after the rows the cache holds now
+                    new = np.fromiter((url not in _positions for url in missing), dtype=bool, count=len(missing))
+                    start = len(_columns['path']) if _columns else 0
+                    added = [url for url, keep in zip(missing, new) if keep]
+                    _positions.update(zip(added, range(start, start + len(added))))
+                    _columns = {field: np.concatenate([_columns[field], parsed[field][new]]) if _columns else parsed[field][new]
+                                for field in FIELDS}
+
+    rows = found[codes] if len(found) else np.zeros(len(codes), dtype=np.int64)
+    missing = codes < 0
+    result = {}
+    for field in FIELDS:
+        values = columns[field][rows] if field in columns else np.zeros(len(codes))
+        if values.dtype == object:
+            values = np.where(missing, None, values)
+            result[field] = pd.array(values, dtype='string')
+        else:
+            array = pd.array(values, dtype='boolean' if values.dtype == bool else 'Int16')
+            array[missing] = pd.NA
+            result[field] = array
+    return pd.DataFrame(result, index=urls.index)
+
+
+def effort_levels(urls: pd.Series) -> pd.Series:
+    """
+    Effort level of each page, the way the tracker's ``count`` column is defined
+
+    The level is the number of slashes in the legacy URL, i.e. the path depth plus the three
+    slashes of ``https://host/`` for the site's trailing-slash URLs.
+
+    Args:
+        urls (pd.Series): Legacy URLs
+
+    Returns:
+        pd.Series: ``Int8`` levels, missing where the URL is missing or deeper than
+        ``schema.EFFORT_RANGE`` allows (e.g. crawl traps)
+    """
+    return schema.effort_levels(analyze_urls(urls)['slashes']).rename('count')